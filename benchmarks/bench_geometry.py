@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the guide geometry pipeline, with a regression gate.
+
+    python benchmarks/bench_geometry.py                      # run and print
+    python benchmarks/bench_geometry.py --save baseline.json # record a baseline
+    python benchmarks/bench_geometry.py --compare baseline.json --threshold 0.5
+    python benchmarks/bench_geometry.py --golden             # byte-exact output check only
+    python benchmarks/bench_geometry.py --allocations        # also track tracemalloc blocks and peaks
+    python benchmarks/bench_geometry.py --update-golden      # after an intended output change
+
+Timings are the best of several runs, in seconds per call. ``--compare``
+exits with status 1 when any stage is slower than the baseline by more than
+``--threshold`` (a fraction), or when the golden SVGs no longer match.
+Baselines are machine specific, so none is kept in the repository: the
+first ``--compare`` on a machine records its baseline to the given file
+(check out the commit to compare against first) and later runs compare
+against it. Only ``--golden`` is a portable gate. A fixed reference workload is timed with every run and scales the baseline
+to the machine's current speed, and stages that look slower are timed again
+before they count, but shared or throttled machines still jitter by 20-30 %,
+hence the loose default threshold.
+
+With ``--allocations`` every build_svg case is also run once under
+tracemalloc. Block counts and peak memory barely depend on the machine, so
+they are saved and compared alongside the times with a tighter
+``--alloc-threshold``. Snapshots of the largest cases are slow; the full
+matrix takes minutes, ``--quick`` seconds.
+"""
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from loomis_head.alloc_profile import MODULES, measure  # noqa: E402
+from loomis_head.euclid import Vector3  # noqa: E402
+from loomis_head.geom_polyline import clip_to_side_band, path_str, split_front_back  # noqa: E402
+from loomis_head.linalg import q_from_yaw_pitch_roll, q_to_yaw_pitch_roll  # noqa: E402
+from loomis_head.loomis_head_generator import LoomisHead3D, View  # noqa: E402
+
+GOLDEN_DIR = Path(__file__).resolve().parent / "golden"
+
+SAMPLES = (64, 256, 1024, 4096)
+CANVASES = ((512, 512), (1920, 1080), (8000, 8000))
+SIDE_CUTS = (0.3, 0.66, 0.9)
+
+# yaw, pitch, roll in degrees
+POSES = {
+    "front": (0.0, 0.0, 0.0),  # side rims edge-on, every rim point has z == 0
+    "three_quarter": (35.0, -15.0, 5.0),
+    "profile": (90.0, 0.0, 0.0),  # silhouette coincides with the centerline
+    "top": (0.0, 90.0, 0.0),  # silhouette coincides with the equator
+    "near_edge_on": (0.0005, 0.0005, 0.0),  # crossings within EPS of the samples
+    "tumbled": (137.0, -62.0, 211.0),
+}
+
+GOLDEN_CASES = [(pose, 256, False) for pose in POSES] + [
+    ("three_quarter", 64, False),
+    ("three_quarter", 256, True),
+    ("top", 256, True),
+]
+
+
+def pose_q(name: str):
+    return q_from_yaw_pitch_roll(*(math.radians(a) for a in POSES[name]))
+
+
+def best_time(fn: Callable[[], object], min_time: float, min_repeats: int = 5) -> float:
+    """
+    Best time per call of ``fn``. Calls are batched so one batch takes at
+    least a couple of milliseconds, which keeps timer resolution and
+    scheduler noise out of the fast stages; the best of the batches counts.
+    """
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= 0.002:
+            break
+        number *= 4
+
+    best = elapsed / number
+    repeats = 1
+    start = time.perf_counter()
+    while repeats < min_repeats or time.perf_counter() - start < min_time:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+        repeats += 1
+    return best
+
+
+def head_for(pose: str, side_cut: float = 0.66, perspective: bool = False) -> LoomisHead3D:
+    head = LoomisHead3D()
+    head.set_quaternion(pose_q(pose))
+    head.set_sidecut(side_cut)
+    head.set_perspective(perspective)
+    return head
+
+
+def build_svg_uncached(head: LoomisHead3D, width: float, height: float, samples: int) -> str:
+    # Drop the geometry cache so every run measures a cold build of a new pose.
+    head._geometry_cache = None
+    return head.build_svg(width, height, "5,6", samples)
+
+
+def stage_cases(quick: bool) -> dict[str, Callable[[], object]]:
+    samples_set = SAMPLES[:2] if quick else SAMPLES
+    canvases = CANVASES[1:2] if quick else CANVASES
+    side_cuts = SIDE_CUTS[1:2] if quick else SIDE_CUTS
+    cases: dict[str, Callable[[], object]] = {}
+
+    for samples in samples_set:
+        for pose in POSES:
+            q = pose_q(pose)
+            head = head_for(pose)
+            circle = head._circle_on_plane(Vector3(0.0, 0.0, 1.0), [0.0, 0.0, 0.0], 1.0, samples)
+            rotated = head._to_camera(circle, q)
+            xy = head._to_screen(rotated, View(q, 0.0, 0.0, 1920.0, 1080.0))
+            cases[f"to_camera/{pose}/{samples}"] = lambda h=head, c=circle, q=q: h._to_camera(c, q)
+            cases[f"split_front_back/{pose}/{samples}"] = lambda r=rotated: split_front_back(r)
+            cases[f"clip_to_side_band/{pose}/{samples}"] = lambda c=rotated: clip_to_side_band(c, 0.66)
+            cases[f"path_str/{pose}/{samples}"] = lambda p=xy: path_str(p)
+
+            for width, height in canvases:
+                for side_cut in side_cuts:
+                    for perspective in (False, True):
+                        name = f"build_svg/{pose}/{samples}/{width}x{height}/cut{side_cut}/{'persp' if perspective else 'ortho'}"
+                        h = head_for(pose, side_cut, perspective)
+                        cases[name] = lambda h=h, w=width, hh=height, s=samples: build_svg_uncached(h, w, hh, s)
+
+    angles = [(math.radians(y), math.radians(p), math.radians(r)) for y, p, r in POSES.values()]
+    cases["trackball/yaw_pitch_roll_roundtrip"] = lambda: [q_to_yaw_pitch_roll(q_from_yaw_pitch_roll(*a)) for a in angles]
+    return cases
+
+
+def reference_workload() -> None:
+    """Fixed pure-Python work whose time tracks the speed of the machine and interpreter."""
+    v = Vector3(0.3, 0.4, 0.5)
+    for _ in range(2000):
+        v = (v + Vector3(0.1, 0.2, 0.3)) * 0.5
+
+
+def run(quick: bool, min_time: float, only: str | None) -> dict[str, float]:
+    results: dict[str, float] = {}
+    for name, fn in stage_cases(quick).items():
+        if only and only not in name:
+            continue
+        results[name] = best_time(fn, min_time)
+        print(f"{results[name] * 1e3:10.3f} ms  {name}", flush=True)
+    return results
+
+
+def run_allocations(quick: bool, only: str | None) -> dict[str, dict[str, int]]:
+    """Blocks held after, and peak bytes during, one cold build of each build_svg case."""
+    results: dict[str, dict[str, int]] = {}
+    for name, fn in stage_cases(quick).items():
+        if not name.startswith("build_svg/") or (only and only not in name):
+            continue
+        fn()  # warm the shared trig tables, which outlive any one build
+        _, profile = measure(fn)
+        results[name] = {"blocks": profile.blocks, "bytes": profile.size, "peak": profile.peak}
+        results[name].update({f"blocks/{module}": profile.modules[module][0] for module in MODULES})
+        print(f"{profile.blocks:10d} blocks {profile.peak / 1024:10.1f} KiB peak  {name}", flush=True)
+    return results
+
+
+def compare_allocations(
+    results: dict[str, dict[str, int]], baseline: dict[str, dict[str, int]], threshold: float
+) -> list[tuple[str, float]]:
+    """Cases whose block count or peak grew by more than ``threshold``, worst first."""
+    regressions = []
+    for name, counts in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in ("blocks", "peak"):
+            if base[metric] and counts[metric] / base[metric] - 1.0 > threshold:
+                regressions.append((f"{name} {metric}", counts[metric] / base[metric]))
+    return sorted(regressions, key=lambda item: -item[1])
+
+
+def golden_name(pose: str, samples: int, perspective: bool) -> str:
+    return f"{pose}_{samples}_{'persp' if perspective else 'ortho'}.svg"
+
+
+def golden_svg(pose: str, samples: int, perspective: bool) -> str:
+    return head_for(pose, perspective=perspective).build_svg(1024, 768, "8,8", samples)
+
+
+def check_golden(update: bool) -> list[str]:
+    """Names of golden files whose content changed; rewrites them with ``update``."""
+    mismatched = []
+    GOLDEN_DIR.mkdir(exist_ok=True)
+    for pose, samples, perspective in GOLDEN_CASES:
+        path = GOLDEN_DIR / golden_name(pose, samples, perspective)
+        svg = golden_svg(pose, samples, perspective)
+        if update:
+            path.write_text(svg, encoding="utf-8")
+        elif not path.exists() or path.read_text(encoding="utf-8") != svg:
+            mismatched.append(path.name)
+    return mismatched
+
+
+def compare(
+    results: dict[str, float],
+    baseline: dict[str, float],
+    threshold: float,
+    speed: float = 1.0,
+    retime: Callable[[str], float] | None = None,
+) -> list[tuple[str, float]]:
+    """
+    Stages slower than ``baseline`` by more than ``threshold``, worst first.
+    ``speed`` scales the baseline to this machine's current speed. Suspects
+    are timed again through ``retime`` and only kept if they stay slow, so
+    one noisy measurement does not fail the gate.
+    """
+    regressions = []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = seconds / (base * speed)
+        if ratio - 1.0 > threshold and retime is not None:
+            ratio = min(ratio, retime(name) / (base * speed))
+        if ratio - 1.0 > threshold:
+            regressions.append((name, ratio))
+    return sorted(regressions, key=lambda item: -item[1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--save", metavar="JSON", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="fail on regressions against this baseline")
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed slowdown, as a fraction (default 0.5)")
+    parser.add_argument("--quick", action="store_true", help="64 and 256 samples, one canvas and side cut")
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds spent timing each case")
+    parser.add_argument("--only", metavar="TEXT", help="run the cases whose name contains TEXT")
+    parser.add_argument("--allocations", action="store_true", help="also profile build_svg allocations with tracemalloc")
+    parser.add_argument("--alloc-threshold", type=float, default=0.1, help="allowed growth in blocks or peak (default 0.1)")
+    parser.add_argument("--golden", action="store_true", help="only check the golden SVGs")
+    parser.add_argument("--update-golden", action="store_true", help="rewrite the golden SVGs")
+    args = parser.parse_args(argv)
+
+    mismatched = check_golden(args.update_golden)
+    if args.update_golden:
+        print(f"golden SVGs written to {GOLDEN_DIR}")
+        return 0
+    for name in mismatched:
+        print(f"golden mismatch: {name}", file=sys.stderr)
+    if args.golden:
+        return 1 if mismatched else 0
+
+    reference = best_time(reference_workload, args.min_time)
+    results = run(args.quick, args.min_time, args.only)
+    allocations = run_allocations(args.quick, args.only) if args.allocations else None
+
+    # the first comparison on a machine records the baseline it compares against later
+    record_baseline = bool(args.compare) and not Path(args.compare).exists()
+    if args.save or record_baseline:
+        meta = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "reference": reference,
+        }
+        saved = {"meta": meta, "results": results}
+        if allocations is not None:
+            saved["allocations"] = allocations
+        for path in (args.save, args.compare if record_baseline else None):
+            if path:
+                Path(path).write_text(json.dumps(saved, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+                print(f"baseline written to {path}")
+
+    status = 1 if mismatched else 0
+    if args.compare and not record_baseline:
+        saved = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        base_reference = saved["meta"].get("reference")
+        speed = reference / base_reference if base_reference else 1.0
+        cases = stage_cases(args.quick)
+        regressions = compare(results, saved["results"], args.threshold, speed, lambda name: best_time(cases[name], 4 * args.min_time))
+        if allocations is not None:
+            regressions += compare_allocations(allocations, saved.get("allocations", {}), args.alloc_threshold)
+        for name, ratio in regressions:
+            print(f"regression: {name} is {ratio:.2f}x the baseline", file=sys.stderr)
+        if regressions:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Stand-in for Krita's ``krita`` Python module, enough of it to run the Loomis
+head docker under an offscreen Qt platform.
+
+Only the calls the plugin makes exist. Layers keep their shapes and pixel
+writes so a replay can check what was written, and the calls that are
+expensive in Krita spend a simulated cost on the calling thread, the GUI
+thread in Krita too. ``COST`` holds the model in seconds; ``COST_SCALE``
+scales all of it, 0 turns it off. The defaults are rough figures for a
+mid-range machine and only need to keep the ratio of Python work to Krita
+work plausible.
+
+Shape edits and animation imports are undoable in Krita; the document
+counts them in ``undo_commands`` so a replay can check what a gesture leaves
+in the undo history. Pixel writes and layer changes made from Python are not
+recorded.
+"""
+
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from time import perf_counter
+
+from PyQt5.QtCore import QByteArray, QObject, QUuid
+from PyQt5.QtWidgets import QDockWidget
+
+COST = {
+    "add_shapes": 1.0e-3,  # per addShapesFromSvg call
+    "add_shapes_per_kib": 0.25e-3,  # SVG parsing and shape creation
+    "remove_shape": 0.05e-3,  # per shape, undo command included
+    "set_pixel_data_per_mpx": 2.0e-3,
+    "refresh_projection": 0.5e-3,
+}
+COST_SCALE = 1.0
+
+# Totals of the simulated calls since the last reset_counters.
+counters: dict[str, float] = {}
+
+
+def reset_counters() -> None:
+    counters.clear()
+
+
+def _spend(kind: str, seconds: float) -> None:
+    """Holds the calling thread for ``seconds`` of simulated Krita work."""
+    counters[kind] = counters.get(kind, 0) + 1
+    counters[kind + "_seconds"] = counters.get(kind + "_seconds", 0.0) + seconds * COST_SCALE
+    end = perf_counter() + seconds * COST_SCALE
+    while perf_counter() < end:
+        pass
+
+
+class Shape:
+    def __init__(self, layer: "Node", element: str) -> None:
+        self.layer = layer
+        self.element = element
+
+    def type(self) -> str:
+        return self.element
+
+    def remove(self) -> bool:
+        if self not in self.layer._shapes:
+            return False
+        _spend("remove_shape", COST["remove_shape"])
+        self.layer._shapes.remove(self)
+        self.layer.doc.undo_commands += 1
+        return True
+
+
+class Node:
+    def __init__(self, doc: "Document", name: str, node_type: str) -> None:
+        self.doc = doc
+        self._name = name
+        self._type = node_type
+        self._visible = True
+        self._children: list[Node] = []
+        self._shapes: list[Shape] = []
+        self._keyframes: set[int] = set()
+        self._uuid = QUuid.createUuid()
+        self.pixel_writes = 0
+
+    def name(self) -> str:
+        return self._name
+
+    def setName(self, name: str) -> None:
+        self._name = name
+
+    def type(self) -> str:
+        return self._type
+
+    def uniqueId(self) -> QUuid:
+        return self._uuid
+
+    def visible(self) -> bool:
+        return self._visible
+
+    def setVisible(self, visible: bool) -> None:
+        self._visible = visible
+
+    def childNodes(self) -> list["Node"]:
+        return list(self._children)
+
+    def addChildNode(self, child: "Node", above: "Node | None") -> bool:
+        index = self._children.index(above) + 1 if above in self._children else len(self._children)
+        self._children.insert(index, child)
+        return True
+
+    def removeChildNode(self, child: "Node") -> bool:
+        if child not in self._children:
+            return False
+        self._children.remove(child)
+        return True
+
+    def shapes(self) -> list[Shape]:
+        return list(self._shapes)
+
+    def addShapesFromSvg(self, svg: str) -> list[Shape]:
+        _spend("add_shapes", COST["add_shapes"] + COST["add_shapes_per_kib"] * len(svg) / 1024.0)
+        root = ET.fromstring(svg)  # Krita rejects malformed SVG as well
+        # one shape per top-level element, as in Krita: a <g> becomes a single group shape
+        added = [Shape(self, el.tag.rpartition("}")[2]) for el in root]
+        self._shapes.extend(added)
+        self.doc.undo_commands += 1
+        return added
+
+    def setPixelData(self, data, x: int, y: int, w: int, h: int) -> None:
+        if len(data) != w * h * 4:
+            raise ValueError(f"setPixelData got {len(data)} bytes for a {w}x{h} BGRA region")
+        _spend("set_pixel_data", COST["set_pixel_data_per_mpx"] * w * h / 1e6)
+        self.pixel_writes += 1
+
+    def hasKeyframeAtTime(self, time: int) -> bool:
+        return time in self._keyframes
+
+
+class Document:
+    def __init__(self, width: int = 1920, height: int = 1080) -> None:
+        self._width = width
+        self._height = height
+        self._root = Node(self, "root", "grouplayer")
+        self._time = 0
+        self.undo_commands = 0
+        self._annotations: dict[str, tuple[str, bytes]] = {}
+
+    def width(self) -> int:
+        return self._width
+
+    def height(self) -> int:
+        return self._height
+
+    def colorModel(self) -> str:
+        return "RGBA"
+
+    def colorDepth(self) -> str:
+        return "U8"
+
+    def rootNode(self) -> Node:
+        return self._root
+
+    def createNode(self, name: str, node_type: str) -> Node:
+        return Node(self, name, node_type)
+
+    def createVectorLayer(self, name: str) -> Node:
+        return Node(self, name, "vectorlayer")
+
+    def refreshProjection(self) -> None:
+        _spend("refresh_projection", COST["refresh_projection"])
+
+    def waitForDone(self) -> None:
+        pass
+
+    def currentTime(self) -> int:
+        return self._time
+
+    def setCurrentTime(self, time: int) -> None:
+        self._time = time
+
+    def fullClipRangeStartTime(self) -> int:
+        return 0
+
+    def fullClipRangeEndTime(self) -> int:
+        return 23
+
+    def importAnimation(self, files: list[str], first_frame: int, step: int) -> bool:
+        """Adds a paint layer with one keyframe per file, one undo step as in Krita."""
+        if not files or not all(os.path.exists(f) for f in files):
+            return False
+        node = Node(self, "Imported animation", "paintlayer")
+        node._keyframes = {first_frame + i * step for i in range(len(files))}
+        node.pixel_writes = len(files)
+        self._root.addChildNode(node, None)
+        self.undo_commands += 1
+        return True
+
+    def annotationTypes(self) -> list[str]:
+        return list(self._annotations)
+
+    def annotation(self, kind: str) -> QByteArray:
+        return QByteArray(self._annotations.get(kind, ("", b""))[1])
+
+    def setAnnotation(self, kind: str, description: str, data: QByteArray) -> None:
+        self._annotations[kind] = (description, bytes(data))
+
+
+class Krita(QObject):
+    _instance: "Krita | None" = None
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.active_document: Document | None = None
+        self.open_documents: list[Document] = []
+        self.app_data = os.path.join(tempfile.gettempdir(), "loomis_head_krita_stub")
+        os.makedirs(self.app_data, exist_ok=True)
+
+    @classmethod
+    def instance(cls) -> "Krita":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def activeDocument(self) -> Document | None:
+        return self.active_document
+
+    def documents(self) -> list[Document]:
+        return list(self.open_documents)
+
+    def open_document(self, doc: Document) -> None:
+        """Opens ``doc`` and makes it the active document; not in Krita's API."""
+        if doc not in self.open_documents:
+            self.open_documents.append(doc)
+        self.active_document = doc
+
+    def activeWindow(self):
+        return None  # no canvas: the docker falls back from the overlay to the layer
+
+    def getAppDataLocation(self) -> str:
+        return self.app_data
+
+    def addDockWidgetFactory(self, factory) -> None:
+        pass
+
+    def addExtension(self, extension) -> None:
+        pass
+
+
+class DockWidget(QDockWidget):
+    def canvasChanged(self, canvas) -> None:
+        pass
+
+
+class DockWidgetFactoryBase:
+    class DockPosition:
+        DockTop, DockBottom, DockLeft, DockRight, DockTornOff, DockMinimized = range(6)
+
+
+class DockWidgetFactory(DockWidgetFactoryBase):
+    def __init__(self, name: str, position: int, docker) -> None:
+        self.name = name
+        self.position = position
+        self.docker = docker
+
+
+class Extension(QObject):
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+
+    def setup(self) -> None:
+        pass
+
+    def createActions(self, window) -> None:
+        pass
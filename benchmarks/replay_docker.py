@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Replays a recorded docker session outside Krita and reports per-event latency.
+
+    LOOMIS_HEAD_RECORD=drag.jsonl krita                    # record a session in Krita
+    python benchmarks/replay_docker.py drag.jsonl          # replay it at recorded speed
+    python benchmarks/replay_docker.py drag.jsonl --speed 0 --krita-cost 0
+    python benchmarks/replay_docker.py --synthetic --json result.json
+
+The docker runs on the offscreen Qt platform against the stand-in ``krita``
+module in ``benchmarks/krita_stub``, which simulates the cost of shape
+parsing and pixel writes. Latency is measured from injecting an event to
+the end of the redraw that shows it, so events coalesced into one redraw
+share its completion time and queueing shows up as latency.
+
+``--speed 0`` injects each event only after the previous one is drawn:
+no coalescing and no dependence on timer jitter, for deterministic CI
+comparisons. ``--synthetic`` replays a generated trackball drag followed
+by a slider drag instead of a recording.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent / "krita_stub"))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import krita  # noqa: E402  (the stand-in from krita_stub)
+from loomis_head.build_stats import percentile  # noqa: E402
+from loomis_head.euclid import Quaternion  # noqa: E402
+from loomis_head.event_recorder import FORMAT, VERSION, read_events  # noqa: E402
+from loomis_head.linalg import q_from_yaw_pitch_roll  # noqa: E402
+from PyQt5.QtCore import QEventLoop  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+# Events that change the guides and so end in a redraw.
+DRAWN = ("orientation", "value", "toggle", "release")
+
+
+def synthetic_session(rate: float = 120.0) -> tuple[dict, list[dict]]:
+    """A two-second trackball turn and a one-second size slider drag at ``rate`` events per second."""
+    events = [{"t": 0.0, "event": "press", "target": "trackball"}]
+    n = int(2.0 * rate)
+    for i in range(1, n + 1):
+        q = q_from_yaw_pitch_roll(math.radians(90.0 * i / n), math.radians(-20.0 * i / n), 0.0)
+        events.append({"t": i / rate, "event": "orientation", "target": "trackball", "value": [q.w, q.x, q.y, q.z]})
+    t = events[-1]["t"]
+    events.append({"t": t, "event": "release", "target": "trackball"})
+    events.append({"t": t + 0.2, "event": "press", "target": "sizeSlider"})
+    for i in range(1, int(rate) + 1):
+        events.append({"t": t + 0.2 + i / rate, "event": "value", "target": "sizeSlider", "value": 100 + i * 50 // int(rate)})
+    events.append({"t": events[-1]["t"], "event": "release", "target": "sizeSlider"})
+    return {"format": FORMAT, "version": VERSION, "width": 1920, "height": 1080}, events
+
+
+class Replay:
+    def __init__(self, docker, app: QApplication) -> None:
+        self.docker = docker
+        self.app = app
+        self.pending: list[float] = []  # injection times of events not drawn yet
+        self.latencies: list[float] = []
+        self.redraws = 0
+
+        redraw = docker.redraw
+
+        def timed_redraw():
+            redraw()
+            now = time.perf_counter()
+            self.latencies.extend(now - t for t in self.pending)
+            self.pending.clear()
+            self.redraws += 1
+
+        # schedule_update looks redraw up on the instance when it posts it
+        docker.redraw = timed_redraw
+
+    def inject(self, event: dict) -> None:
+        docker, kind, target = self.docker, event["event"], event["target"]
+        if kind in DRAWN:
+            self.pending.append(time.perf_counter())
+        if target == "trackball":
+            trackball = docker.trackball
+            if kind == "press":
+                trackball.interaction_started.emit()
+            elif kind == "release":
+                trackball.interaction_finished.emit()
+            else:
+                trackball.orientation_changed.emit(Quaternion(*event["value"]))
+            return
+
+        widget = getattr(docker.ui, target)
+        if kind == "press":
+            widget.sliderPressed.emit()
+        elif kind == "release":
+            widget.sliderReleased.emit()
+        elif kind == "value":
+            widget.setValue(event["value"])
+        else:
+            widget.setChecked(event["value"])
+
+    def settle(self) -> None:
+        while self.docker.update_scheduled:
+            self.app.processEvents(QEventLoop.AllEvents)
+        # events that needed no redraw, e.g. a slider set to its current value
+        self.pending.clear()
+
+    def run(self, events: list[dict], speed: float) -> float:
+        start = time.perf_counter()
+        for event in events:
+            if speed > 0:
+                due = start + event["t"] / speed
+                while time.perf_counter() < due:
+                    self.app.processEvents(QEventLoop.AllEvents)
+            self.inject(event)
+            if speed <= 0:
+                self.settle()
+        self.settle()
+        return time.perf_counter() - start
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("session", nargs="?", help="JSON lines file written with LOOMIS_HEAD_RECORD")
+    parser.add_argument("--synthetic", action="store_true", help="replay a generated drag instead of a recording")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed; 0 waits for every redraw (default 1)")
+    parser.add_argument("--krita-cost", type=float, default=1.0, help="scale of the simulated Krita costs, 0 turns them off")
+    parser.add_argument("--frame-budget", type=float, metavar="MS", help="frame budget of the quality controller, 0 for fixed detail")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+    if bool(args.session) == args.synthetic:
+        parser.error("give either a session file or --synthetic")
+
+    header, events = synthetic_session() if args.synthetic else read_events(args.session)
+
+    app = QApplication.instance() or QApplication([])
+    krita.COST_SCALE = args.krita_cost
+    krita.Krita.instance().open_document(krita.Document(header["width"], header["height"]))
+
+    from loomis_head.loomis_head_plugin import LoomisProportionsDocker
+
+    docker = LoomisProportionsDocker()
+    if args.frame_budget is not None:
+        docker.quality.set_budget(args.frame_budget * 1e-3 or None)
+    replay = Replay(docker, app)
+    replay.settle()  # the initial draw into the new layer
+    replay.latencies.clear()
+    replay.redraws = 0
+    krita.reset_counters()
+    doc = krita.Krita.instance().active_document
+    undo_before = doc.undo_commands
+
+    wall = replay.run(events, args.speed)
+    lat = replay.latencies
+    report = {
+        "events": len(events),
+        "drawn_events": len(lat),
+        "redraws": replay.redraws,
+        "wall_seconds": wall,
+        "latency_median_ms": percentile(lat, 50) * 1e3,
+        "latency_p95_ms": percentile(lat, 95) * 1e3,
+        "latency_max_ms": max(lat, default=0.0) * 1e3,
+        "krita": dict(krita.counters),
+        "undo_commands": doc.undo_commands - undo_before,
+        "quality": docker.quality.quality()._asdict(),
+    }
+    print(f"{report['events']} events, {report['redraws']} redraws in {wall:.2f} s")
+    print(
+        f"latency: {report['latency_median_ms']:.1f} ms median, "
+        f"{report['latency_p95_ms']:.1f} ms p95, {report['latency_max_ms']:.1f} ms max"
+    )
+    print(f"quality at the end: {report['quality']}")
+    print(f"undo commands: {report['undo_commands']}")
+    for kind in ("add_shapes", "remove_shape", "set_pixel_data", "refresh_projection"):
+        if kind in krita.counters:
+            print(f"krita {kind}: {krita.counters[kind]:.0f} calls, {krita.counters[kind + '_seconds'] * 1e3:.1f} ms simulated")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=1) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
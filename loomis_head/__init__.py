@@ -1,7 +1,11 @@
-from krita import Krita
+try:
+    from krita import Krita
+except ImportError:  # imported outside Krita, e.g. by the command-line renderer
+    Krita = None
 
-from .loomis_head_plugin import LoomisHeadPlugin
+if Krita is not None:
+    from .loomis_head_plugin import LoomisHeadPlugin
 
-app = Krita.instance()
-extension = LoomisHeadPlugin(app)
-app.addExtension(extension)
+    app = Krita.instance()
+    extension = LoomisHeadPlugin(app)
+    app.addExtension(extension)
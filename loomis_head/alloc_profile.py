@@ -0,0 +1,64 @@
+import os
+import tracemalloc
+from collections.abc import Callable
+from typing import NamedTuple
+
+# Modules reported on their own; every other allocation counts as "other".
+MODULES = ("euclid", "geom_polyline", "loomis_head_generator")
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class AllocProfile(NamedTuple):
+    """
+    Memory cost of one call. Snapshots only see what is still alive when the
+    call returns (its result and whatever it cached), so short-lived
+    temporaries show up in ``peak`` rather than in the block counts.
+    """
+
+    blocks: int  # blocks allocated by the call and still held afterwards
+    size: int  # their bytes
+    peak: int  # highest traced bytes during the call, above the level it started at
+    modules: dict[str, tuple[int, int]]  # blocks and bytes per module of MODULES, plus "other"
+
+
+def _module(filename: str) -> str:
+    if os.path.dirname(os.path.abspath(filename)) == _PACKAGE_DIR:
+        name = os.path.splitext(os.path.basename(filename))[0]
+        if name in MODULES:
+            return name
+    return "other"
+
+
+def measure(fn: Callable[[], object]) -> tuple[object, AllocProfile]:
+    """
+    Calls ``fn`` between two tracemalloc snapshots and returns its result
+    with the allocations it made. Starts tracing for the call if it is not
+    on already; tracing makes the call several times slower.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        before = tracemalloc.take_snapshot().filter_traces(ignore)
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(ignore)
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    modules = {name: (0, 0) for name in MODULES + ("other",)}
+    blocks = size = 0
+    for stat in after.compare_to(before, "filename"):
+        if stat.count_diff <= 0:
+            continue
+        name = _module(stat.traceback[0].filename)
+        count, nbytes = modules[name]
+        modules[name] = (count + stat.count_diff, nbytes + stat.size_diff)
+        blocks += stat.count_diff
+        size += stat.size_diff
+    return result, AllocProfile(blocks, size, max(0, peak - base), modules)
@@ -0,0 +1,40 @@
+from bisect import bisect_right
+
+from .linalg import Quaternion, q_normalize, q_slerp
+
+
+class OrientationTrack:
+    """
+    Orientation keyframes of one head, keyed by timeline frame. Frames
+    between two keys are slerped; frames outside the keyed range hold the
+    nearest key.
+    """
+
+    def __init__(self) -> None:
+        self.keys: dict[int, Quaternion] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def set_key(self, frame: int, q: Quaternion) -> None:
+        self.keys[frame] = q_normalize(q)
+
+    def remove_key(self, frame: int) -> None:
+        self.keys.pop(frame, None)
+
+    def orientation_at(self, frame: int) -> Quaternion | None:
+        """Interpolated orientation, or None without keys."""
+        if not self.keys:
+            return None
+        frames = sorted(self.keys)
+        i = bisect_right(frames, frame)
+        if i == 0:
+            return self.keys[frames[0]]
+        if i == len(frames):
+            return self.keys[frames[-1]]
+        f0, f1 = frames[i - 1], frames[i]
+        return q_slerp(self.keys[f0], self.keys[f1], (frame - f0) / (f1 - f0))
+
+    def orientations(self, start: int, end: int) -> list[Quaternion | None]:
+        """``orientation_at`` for every frame from ``start`` to ``end`` inclusive."""
+        return [self.orientation_at(frame) for frame in range(start, end + 1)]
@@ -0,0 +1,159 @@
+import math
+from collections import deque
+from collections.abc import Iterator, Sequence
+from time import perf_counter
+from typing import NamedTuple
+
+# Pipeline stages in the order a build runs them.
+STAGES = ("curves", "clipping", "rotation", "split", "projection", "formatting")
+
+
+class StageStats:
+    """Wall time and polyline counts of one stage of one build."""
+
+    __slots__ = ("seconds", "vertices_in", "vertices_out", "segments")
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        self.vertices_in = 0
+        self.vertices_out = 0
+        self.segments = 0  # polylines the stage produced
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class BuildRecord:
+    """
+    Measurements of one build. Stages skipped thanks to a cache stay at
+    zero; ``geometry_cached`` tells whether that happened.
+    """
+
+    __slots__ = ("samples", "views", "stages", "svg_bytes", "geometry_cached")
+
+    def __init__(self, samples: int, views: int) -> None:
+        self.samples = samples
+        self.views = views
+        self.stages = {stage: StageStats() for stage in STAGES}
+        self.svg_bytes = 0
+        self.geometry_cached = False
+
+    def add(self, stage: str, t0: float, vertices_in: int, vertices_out: int, segments: int) -> float:
+        """Charges the time since ``t0`` to ``stage``; returns the current time for the next stage."""
+        now = perf_counter()
+        s = self.stages[stage]
+        s.seconds += now - t0
+        s.vertices_in += vertices_in
+        s.vertices_out += vertices_out
+        s.segments += segments
+        return now
+
+    def total(self) -> float:
+        return sum(s.seconds for s in self.stages.values())
+
+    def as_dict(self) -> dict:
+        return {
+            "samples": self.samples,
+            "views": self.views,
+            "stages": {stage: s.as_dict() for stage, s in self.stages.items()},
+            "svg_bytes": self.svg_bytes,
+            "geometry_cached": self.geometry_cached,
+        }
+
+
+class BuildStats:
+    """
+    Ring buffer of the most recent builds of one head. Assign one to
+    ``LoomisHead3D.stats`` to start recording; with ``stats`` left at None
+    the pipeline takes no timestamps at all.
+    """
+
+    def __init__(self, capacity: int = 256) -> None:
+        self.records: deque[BuildRecord] = deque(maxlen=capacity)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[BuildRecord]:
+        return iter(self.records)
+
+    def start(self, samples: int, views: int) -> BuildRecord:
+        record = BuildRecord(samples, views)
+        self.records.append(record)
+        return record
+
+    def last(self) -> BuildRecord | None:
+        return self.records[-1] if self.records else None
+
+    def clear(self) -> None:
+        self.records.clear()
+
+    def summary(self) -> dict[str, float]:
+        """Mean seconds per stage over the buffered builds, plus their mean ``total``."""
+        n = len(self.records)
+        if not n:
+            return {}
+        out = {stage: sum(r.stages[stage].seconds for r in self.records) / n for stage in STAGES}
+        out["total"] = sum(out.values())
+        return out
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile, ``q`` in 0..100; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(1, min(len(ordered), math.ceil(q / 100.0 * len(ordered)))) - 1]
+
+
+class Frame(NamedTuple):
+    """One redraw of the docker, as the performance HUD sees it."""
+
+    time: float  # perf_counter when the frame was applied
+    build: float  # seconds generating the guides
+    apply: float  # seconds handing them to Krita or the overlay
+    svg_bytes: int
+    vertices: int
+    heads: int
+    cache_hits: int  # heads served without rebuilding
+    samples: int
+
+
+class FrameStats:
+    """Rolling window of the most recent frames of an editing session."""
+
+    def __init__(self, window: int = 120) -> None:
+        self.frames: deque[Frame] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def add(self, frame: Frame) -> None:
+        self.frames.append(frame)
+
+    def clear(self) -> None:
+        self.frames.clear()
+
+    def fps(self) -> float:
+        if len(self.frames) < 2:
+            return 0.0
+        span = self.frames[-1].time - self.frames[0].time
+        return (len(self.frames) - 1) / span if span > 0.0 else 0.0
+
+    def summary(self) -> dict[str, float]:
+        """Rates, medians and totals over the window; empty without frames."""
+        frames = self.frames
+        if not frames:
+            return {}
+        builds = [f.build for f in frames]
+        heads = sum(f.heads for f in frames)
+        return {
+            "fps": self.fps(),
+            "build_median": percentile(builds, 50),
+            "build_p95": percentile(builds, 95),
+            "apply_median": percentile([f.apply for f in frames], 50),
+            "svg_bytes": sum(f.svg_bytes for f in frames) / len(frames),
+            "vertices": frames[-1].vertices,
+            "cache_hit_rate": sum(f.cache_hits for f in frames) / heads if heads else 0.0,
+            "samples": frames[-1].samples,
+        }
@@ -0,0 +1,105 @@
+from collections.abc import Sequence
+
+from PyQt5 import sip
+from PyQt5.QtCore import QEvent, QObject, Qt
+from PyQt5.QtGui import QColor, QPainter, QPainterPath, QTransform
+from PyQt5.QtWidgets import QMdiArea, QWidget
+
+from .geom_polyline import parse_dash
+from .loomis_head_generator import HeadPaths, LoomisHead3D
+from .qt_paint import segments_to_path, stroke_head
+
+CANVAS_CLASS_NAMES = ("KisOpenGLCanvas2", "KisQPainterCanvas")
+
+
+def find_canvas_widget(window) -> QWidget | None:
+    """Returns the canvas widget of the active view in a Krita ``Window``."""
+    if window is None:
+        return None
+    mdi = window.qwindow().findChild(QMdiArea)
+    if mdi is None or mdi.currentSubWindow() is None:
+        return None
+    for child in mdi.currentSubWindow().findChildren(QWidget):
+        if child.metaObject().className() in CANVAS_CLASS_NAMES:
+            return child
+    return None
+
+
+def document_to_widget_transform(view) -> QTransform | None:
+    """
+    Maps document pixels to canvas widget pixels.
+    Needs the flake transforms exposed on ``View`` since Krita 5.2.
+    """
+    if not hasattr(view, "flakeToCanvasTransform") or not hasattr(view, "flakeToImageTransform"):
+        return None
+    image_to_flake, invertible = view.flakeToImageTransform().inverted()
+    if not invertible:
+        return None
+    return image_to_flake * view.flakeToCanvasTransform()
+
+
+class CanvasOverlay(QWidget):
+    """
+    Transparent widget stacked over the canvas that strokes the head guides
+    with QPainter. Used while the user is dragging, so the vector layer only
+    has to be rebuilt once the interaction ends.
+    """
+
+    def __init__(self, canvas_widget: QWidget):
+        super().__init__(canvas_widget)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WA_NoSystemBackground)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setGeometry(canvas_widget.rect())
+        canvas_widget.installEventFilter(self)
+
+        self._transform = QTransform()
+        self._heads: list[tuple[QPainterPath, QPainterPath, QPainterPath, QColor, float, float]] = []
+        self._dash: list[float] = []
+
+    def eventFilter(self, obj: QObject, ev: QEvent) -> bool:
+        if obj is self.parentWidget() and ev.type() == QEvent.Resize:
+            self.setGeometry(self.parentWidget().rect())
+        return False
+
+    def set_paths(
+        self,
+        heads: Sequence[tuple[LoomisHead3D, HeadPaths]],
+        transform: QTransform,
+        dash_back: str | None,
+    ) -> None:
+        self._transform = transform
+        self._heads = [
+            (
+                segments_to_path(paths.front),
+                segments_to_path(paths.back),
+                segments_to_path(paths.arrow),
+                QColor(head.stroke_color),
+                float(head.front_line_stroke),
+                float(head.back_line_stroke),
+            )
+            for head, paths in heads
+        ]
+        self._dash = parse_dash(dash_back)
+        self.update()
+
+    def paintEvent(self, ev):
+        p = QPainter(self)
+        p.setRenderHint(QPainter.Antialiasing)
+        p.setTransform(self._transform)
+        for front, back, arrow, color, front_width, back_width in self._heads:
+            stroke_head(p, front, back, arrow, color, front_width, back_width, self._dash)
+
+
+def attach_overlay(window, current: CanvasOverlay | None = None) -> CanvasOverlay | None:
+    """Returns an overlay on the active canvas, reusing ``current`` when it still sits there."""
+    if current is not None and sip.isdeleted(current):
+        current = None
+
+    canvas_widget = find_canvas_widget(window)
+    if current is not None:
+        if current.parentWidget() is canvas_widget:
+            return current
+        current.hide()
+        current.deleteLater()
+    return CanvasOverlay(canvas_widget) if canvas_widget is not None else None
@@ -0,0 +1,195 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import groupby, islice
+
+from . import geom_cache, np_raster
+from .geom_batch import np
+from .linalg import Quaternion, q_from_yaw_pitch_roll
+from .loomis_head_generator import LoomisHead3D, wrap_svg
+
+# Job keys applied through the LoomisHead3D setter of the same meaning.
+STYLE_SETTERS = {
+    "scale": "set_scale",
+    "side_cut": "set_sidecut",
+    "front_line_stroke": "set_front_line_stroke",
+    "back_line_stroke": "set_back_line_stroke",
+    "show_arrow": "set_arrow",
+    "show_silhouette": "set_silhouette",
+    "show_side_rims": "set_side_rims",
+    "show_side_cross": "set_side_cross",
+    "stroke_color": "set_stroke_color",
+    "perspective": "set_perspective",
+    "focal_length": "set_focal_length",
+}
+
+Job = tuple[int, dict]
+
+
+def job_quaternion(job: dict) -> Quaternion:
+    """``q`` as [w, x, y, z], or ``yaw``/``pitch``/``roll`` in degrees."""
+    if "q" in job:
+        return Quaternion(*map(float, job["q"]))
+    return q_from_yaw_pitch_roll(
+        math.radians(float(job.get("yaw", 0.0))),
+        math.radians(float(job.get("pitch", 0.0))),
+        math.radians(float(job.get("roll", 0.0))),
+    )
+
+
+def job_name(index: int, job: dict) -> str:
+    """``name`` without any directory part, or one derived from the line number."""
+    return os.path.basename(str(job.get("name", f"pose_{index:06d}")))
+
+
+def _style_key(job: dict, defaults: dict) -> tuple:
+    """Everything but the pose; consecutive jobs that share it are rendered as one batch."""
+    merged = {**defaults, **job}
+    keys = (*STYLE_SETTERS, "center", "width", "height", "samples", "dash_back", "format", "background")
+    return tuple(json.dumps(merged.get(k)) for k in keys)
+
+
+def _render_chunk(chunk: list[Job], defaults: dict, out_dir: str) -> int:
+    """Renders ``chunk`` in a worker process and writes one file per job; returns the job count."""
+    for _, group in groupby(chunk, key=lambda item: _style_key(item[1], defaults)):
+        jobs = list(group)
+        spec = {**defaults, **jobs[0][1]}
+        head = LoomisHead3D()
+        for key, setter in STYLE_SETTERS.items():
+            if key in spec:
+                getattr(head, setter)(spec[key])
+        if "center" in spec:
+            head.set_center(*spec["center"])
+
+        width, height = float(spec["width"]), float(spec["height"])
+        all_paths = head.build_poses([job_quaternion(job) for _, job in jobs], width, height, int(spec["samples"]))
+        for (index, job), paths in zip(jobs, all_paths):
+            path = os.path.join(out_dir, job_name(index, job))
+            if spec.get("format") == "png":
+                rgba = np_raster.rasterize([(head, paths)], int(width), int(height), spec["dash_back"], spec.get("background"))
+                np_raster.write_png(path + ".png", rgba)
+            else:
+                with open(path + ".svg", "w", encoding="utf-8") as f:
+                    f.write(wrap_svg(head.svg_group(paths, spec["dash_back"])))
+    return len(chunk)
+
+
+def _init_worker(cache_dir: str | None) -> None:
+    if cache_dir:
+        # every worker maps the same table file instead of recomputing it
+        geom_cache.install(cache_dir)
+
+
+def read_jobs(lines: Iterable[str]) -> Iterator[Job]:
+    """Jobs with their line numbers; a name already taken by an earlier job stops the run, as its file would be overwritten."""
+    names: dict[str, int] = {}
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise SystemExit(f"line {lineno}: {e}") from None
+        name = job_name(lineno, job)
+        if name in names:
+            raise SystemExit(f"line {lineno}: name {name!r} is already used on line {names[name]}")
+        names[name] = lineno
+        yield lineno, job
+
+
+def _require_numpy_for_png(jobs: Iterator[Job], defaults: dict) -> Iterator[Job]:
+    """Passes ``jobs`` through, stopping at the first one that resolves to PNG without NumPy."""
+    for lineno, job in jobs:
+        if np is None and {**defaults, **job}.get("format") == "png":
+            raise SystemExit(f"line {lineno}: png needs NumPy")
+        yield lineno, job
+
+
+def _chunks(jobs: Iterator[Job], size: int) -> Iterator[list[Job]]:
+    while True:
+        chunk = list(islice(jobs, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def render(
+    jobs: Iterator[Job],
+    out_dir: str,
+    defaults: dict,
+    workers: int | None = None,
+    chunk_size: int = 32,
+    cache_dir: str | None = None,
+    progress=None,
+) -> int:
+    """
+    Renders ``jobs`` across a process pool, keeping only a few chunks in
+    flight so the job file is read and the results are written as they go.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    done = 0
+    chunks = _chunks(jobs, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_dir,)) as pool:
+        pending: set[Future] = set()
+        for chunk in chunks:
+            pending.add(pool.submit(_render_chunk, chunk, defaults, out_dir))
+            if len(pending) < 2 * workers:
+                continue
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done += future.result()
+            if progress is not None:
+                progress(done)
+        for future in wait(pending).done:
+            done += future.result()
+    return done
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m loomis_head",
+        description="Render Loomis head guides to SVG or PNG files from a JSON Lines job spec, one pose per line.",
+    )
+    parser.add_argument("jobs", help="JSON Lines file of jobs, or - for stdin")
+    parser.add_argument("-o", "--out", default="loomis_heads", help="output directory")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=32, help="jobs per task sent to a worker")
+    parser.add_argument("--width", type=float, default=1920.0)
+    parser.add_argument("--height", type=float, default=1080.0)
+    parser.add_argument("--samples", type=int, default=256)
+    parser.add_argument("--dash", default="5,6", help="dash pattern of back lines, empty for solid")
+    parser.add_argument("--format", choices=("svg", "png"), default="svg", help="png needs NumPy")
+    parser.add_argument("--background", default=None, help="PNG background color, transparent if omitted")
+    parser.add_argument("--cache-dir", default=None, help="directory of the shared trig table cache")
+    args = parser.parse_args(argv)
+    if args.format == "png" and np is None:
+        parser.error("--format png needs NumPy")
+
+    defaults = {
+        "width": args.width,
+        "height": args.height,
+        "samples": args.samples,
+        "dash_back": args.dash or None,
+        "format": args.format,
+        "background": args.background,
+    }
+
+    def progress(done: int) -> None:
+        elapsed = time.perf_counter() - start
+        print(f"\r{done} poses, {done / max(elapsed, 1e-9):.1f} poses/s", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    f = sys.stdin if args.jobs == "-" else open(args.jobs, encoding="utf-8")
+    with f:
+        jobs = _require_numpy_for_png(read_jobs(f), defaults)
+        done = render(jobs, args.out, defaults, args.workers, args.chunk_size, args.cache_dir, progress)
+    elapsed = time.perf_counter() - start
+    print(f"\r{done} poses in {elapsed:.2f} s, {done / max(elapsed, 1e-9):.1f} poses/s", file=sys.stderr)
+    return 0
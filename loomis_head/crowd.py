@@ -0,0 +1,143 @@
+import math
+from typing import NamedTuple
+
+from .euclid import Matrix4, Quaternion, Vector3
+from .head_collection import HeadCollection
+from .linalg import q_between, q_identity, q_mul
+from .loomis_head_generator import LoomisHead3D
+
+# Average adult head radius relative to standing eye height, used to size
+# heads on the ground plane (1.6 m eye level, ~0.12 m head radius).
+HEAD_RADIUS = 0.075
+
+_CAMERA_FORWARD = Vector3(0.0, 0.0, -1.0)
+
+# Largest grid the docker offers. A 10x30 grid leaves about 120 heads in
+# view, which rebuild in 25-35 ms per drag frame; larger grids grow linearly
+# (1450 heads take about half a second) and no longer follow the pointer.
+MAX_ROWS = 10
+MAX_COLUMNS = 30
+
+
+class CrowdPlacement(NamedTuple):
+    center: tuple[float, float]  # canvas fractions
+    scale: float  # LoomisHead3D.scale
+    radius_px: float
+    q: Quaternion  # apparent orientation, ready for LoomisHead3D.set_quaternion
+
+
+class CrowdLayout:
+    """
+    Heads standing on a ground plane, seen through a pinhole camera.
+
+    The horizon line and vanishing point place the principal point on the
+    canvas, ``eye_height`` is the camera height above the ground and every
+    head sits ``head_height`` above it (both in units of a standing eye
+    level). Heads below the horizon are seen from above, heads beside the
+    vanishing point from the side, which ``place`` folds into each head's
+    orientation.
+    """
+
+    def __init__(self) -> None:
+        self.horizon: float = 0.4  # canvas fraction from the top
+        self.vanishing_x: float = 0.5  # canvas fraction from the left
+        self.eye_height: float = 1.0
+        self.head_height: float = 1.0
+        self.fov_y: float = math.radians(50.0)
+        self.rows: int = 4
+        self.columns: int = 6
+        self.spacing: float = 0.9  # between neighbours on the ground
+        self.near: float = 2.5  # distance of the first row from the camera
+        self.q_world: Quaternion = q_identity()
+
+    def set_horizon(self, horizon: float) -> None:
+        self.horizon = horizon
+
+    def set_vanishing_x(self, vanishing_x: float) -> None:
+        self.vanishing_x = vanishing_x
+
+    def set_eye_height(self, eye_height: float) -> None:
+        self.eye_height = eye_height
+
+    def set_grid(self, rows: int, columns: int) -> None:
+        self.rows = min(max(1, rows), MAX_ROWS)
+        self.columns = min(max(1, columns), MAX_COLUMNS)
+
+    def set_orientation(self, q: Quaternion) -> None:
+        """Facing shared by every head, relative to the camera looking straight ahead."""
+        self.q_world = q
+
+    def ground_spots(self) -> list[Vector3]:
+        """World positions of the heads, camera at the origin looking down -Z."""
+        spots: list[Vector3] = []
+        half = (self.columns - 1) * 0.5
+        for row in range(self.rows):
+            z = -(self.near + row * self.spacing)
+            # stagger every other row, as people rarely stand in perfect files
+            shift = 0.5 * self.spacing if row % 2 else 0.0
+            for col in range(self.columns):
+                x = (col - half) * self.spacing + shift
+                spots.append(Vector3(x, self.head_height - self.eye_height, z))
+        return spots
+
+    def place(self, width: float, height: float) -> list[CrowdPlacement]:
+        """
+        Projects every head in one pass: the combined look-at/perspective
+        matrix is unpacked once and applied to all ground spots.
+        """
+        aspect = width / height if height else 1.0
+        proj = Matrix4.new_perspective(self.fov_y, aspect, 0.05, 1000.0)
+        # new_look_at returns the camera-to-world transform; invert for world-to-camera.
+        view = Matrix4.new_look_at(Vector3(0.0, 0.0, 0.0), _CAMERA_FORWARD, Vector3(0.0, 1.0, 0.0)).inverse()
+        m = proj * view
+        ma, mb, mc, md = m.a, m.b, m.c, m.d
+        me, mf, mg, mh = m.e, m.f, m.g, m.h
+        mm, mn, mo, mp = m.m, m.n, m.o, m.p
+
+        focal_px = 0.5 * height / math.tan(0.5 * self.fov_y)
+        base_px = min(width, height) * 0.3  # LoomisHead3D._to_screen at scale 1
+        px, py = self.vanishing_x * width, self.horizon * height
+
+        out: list[CrowdPlacement] = []
+        for p in self.ground_spots():
+            w = mm * p.x + mn * p.y + mo * p.z + mp
+            if w <= 0.0:
+                continue
+            ndc_x = (ma * p.x + mb * p.y + mc * p.z + md) / w
+            ndc_y = (me * p.x + mf * p.y + mg * p.z + mh) / w
+            sx = px + ndc_x * width * 0.5
+            sy = py - ndc_y * height * 0.5
+
+            radius_px = focal_px * HEAD_RADIUS / w
+            if not (-radius_px <= sx <= width + radius_px and -radius_px <= sy <= height + radius_px):
+                continue
+            # The generator projects orthographically along -Z; undo the turn of
+            # the ray towards this head so it reads as seen from the eye point.
+            q_ray = q_between(_CAMERA_FORWARD, p)
+            q = q_mul(q_ray.conjugated(), self.q_world)
+            out.append(CrowdPlacement((sx / width, sy / height), radius_px / base_px, radius_px, q))
+
+        # far heads first, so nearer heads are drawn on top
+        out.sort(key=lambda c: c.radius_px)
+        return out
+
+    def apply(self, heads: HeadCollection, width: float, height: float) -> list[LoomisHead3D]:
+        """
+        Writes the placements into ``heads``, growing or shrinking it to match.
+        Returns the heads removed, so callers can drop what they keep per head.
+        """
+        placements = self.place(width, height)
+        template = heads[0]
+        while len(heads) < len(placements):
+            heads.add(template)
+        removed: list[LoomisHead3D] = []
+        while len(heads) > max(1, len(placements)):
+            removed.append(heads[len(heads) - 1])
+            heads.remove(removed[-1])
+        for head, placement in zip(heads, placements):
+            if head is not template:
+                head.copy_style(template)
+            head.set_center(*placement.center)
+            head.set_scale(placement.scale)
+            head.set_quaternion(placement.q)
+        return removed
@@ -0,0 +1,119 @@
+import json
+
+from PyQt5.QtCore import QByteArray
+
+from .animation import OrientationTrack
+from .crowd import CrowdLayout
+from .euclid import Quaternion
+from .head_collection import HeadCollection
+
+# Document annotation mapping the names of the docker's layers to their
+# unique ids, so a layer is found again after the user renames it.
+ANNOTATION = "loomis-head/layers"
+
+# Document annotation holding the orientation keys of each head, by head
+# index, so an animation survives saving and reopening the document.
+TRACKS_ANNOTATION = "loomis-head/tracks"
+
+
+def document_key(doc) -> str:
+    """Identifies a document for as long as it is open, whatever its file name."""
+    return doc.rootNode().uniqueId().toString()
+
+
+class DocumentState:
+    """
+    What the docker keeps for one document: its heads and their geometry
+    caches, the crowd, the layers written to and the keys of what they hold.
+    Switching documents swaps whole states, so the layers of a document
+    that was drawn before still match their committed keys and nothing is
+    rebuilt.
+    """
+
+    def __init__(self, doc) -> None:
+        self.doc = doc
+        # kept rather than recomputed: a closed document has no root node to ask
+        self.key = document_key(doc) if doc else None
+        self.heads = HeadCollection()
+        self.crowd = CrowdLayout()
+        self.loomis_head = self.heads[0]
+        self.loomis_layer = None
+        self.head_layers = {}
+        self.committed_keys = {}
+        self.raster_target = None
+        self.tracks = load_tracks(doc, self.heads) if doc else {}
+        self.animation_layer = None
+        # docker options that pick the layers above
+        self.raster_output = False
+        self.layer_per_head = False
+        self.crowd_enabled = False
+
+
+def _read_annotation(doc, name: str) -> dict:
+    if not hasattr(doc, "annotation"):  # the annotation API arrived in Krita 5
+        return {}
+    data = bytes(doc.annotation(name))
+    try:
+        return json.loads(data) if data else {}
+    except ValueError:
+        return {}
+
+
+def layer_ids(doc) -> dict[str, str]:
+    return _read_annotation(doc, ANNOTATION)
+
+
+def find_layer(doc, name: str, node_type: str, taken: set[str] = frozenset()):
+    """
+    A top-level layer of ``doc`` left by an earlier session: the one the
+    annotation recorded for ``name``, else one called ``name``. Only layers
+    of ``node_type`` whose unique id is not in ``taken`` qualify.
+    """
+    candidates = [node for node in doc.rootNode().childNodes() if node.type() == node_type and node.uniqueId().toString() not in taken]
+    uid = layer_ids(doc).get(name)
+    for node in candidates:
+        if node.uniqueId().toString() == uid:
+            return node
+    for node in candidates:
+        if node.name() == name:
+            return node
+    return None
+
+
+def remember_layer(doc, name: str, node) -> None:
+    if not hasattr(doc, "setAnnotation"):
+        return
+    ids = layer_ids(doc)
+    uid = node.uniqueId().toString()
+    if ids.get(name) != uid:
+        ids[name] = uid
+        doc.setAnnotation(ANNOTATION, "Loomis head guide layers", QByteArray(json.dumps(ids).encode()))
+
+
+def load_tracks(doc, heads: HeadCollection) -> dict:
+    """
+    The orientation tracks saved with ``doc``, keyed on the heads of
+    ``heads``. Heads are added for keyed indices past the last one; their
+    placement is not saved and starts from the default.
+    """
+    saved = _read_annotation(doc, TRACKS_ANNOTATION)
+    tracks = {}
+    for index in sorted(saved, key=int):
+        while len(heads) <= int(index):
+            heads.add(heads[0])
+        track = tracks[heads[int(index)]] = OrientationTrack()
+        for frame, w, x, y, z in saved[index]:
+            track.set_key(int(frame), Quaternion(w, x, y, z))
+    return tracks
+
+
+def save_tracks(doc, heads: HeadCollection, tracks: dict) -> None:
+    if not hasattr(doc, "setAnnotation"):
+        return
+    data = {}
+    for index, head in enumerate(heads):
+        track = tracks.get(head)
+        if track:
+            data[str(index)] = [[frame, q.w, q.x, q.y, q.z] for frame, q in sorted(track.keys.items())]
+    if data != _read_annotation(doc, TRACKS_ANNOTATION):
+        doc.setAnnotation(TRACKS_ANNOTATION, "Loomis head orientation keys", QByteArray(json.dumps(data).encode()))
@@ -0,0 +1,80 @@
+import json
+from time import perf_counter
+from typing import IO
+
+FORMAT = "loomis-head-events"
+VERSION = 1
+
+# Docker widgets whose changes are recorded, by object name in LoomisDocker.ui.
+SLIDERS = (
+    "sizeSlider",
+    "sideCutSlider",
+    "frontStrokeSlider",
+    "backStrokeSlider",
+    "posXSlider",
+    "posYSlider",
+    "focalSlider",
+    "horizonSlider",
+    "vanishingSlider",
+    "eyeHeightSlider",
+)
+TOGGLES = ("showArrow", "showSilhouette", "showSideRims", "showSideCross", "perspectiveCheck", "groupCrowd")
+
+
+class EventRecorder:
+    """
+    Writes the trackball and control changes of a docker session to a JSON
+    lines file, one event per line, for ``benchmarks/replay_docker.py``.
+
+    Events are recorded at the signal level (orientations and slider
+    values, not mouse positions), so a replay does not depend on widget
+    sizes or screen scaling. ``t`` is in seconds since the first event.
+    """
+
+    def __init__(self, path: str, width: int, height: int) -> None:
+        self.file: IO[str] | None = open(path, "w", encoding="utf-8")
+        self.start: float | None = None
+        self._write({"format": FORMAT, "version": VERSION, "width": width, "height": height})
+
+    def attach(self, docker) -> None:
+        trackball = docker.trackball
+        trackball.interaction_started.connect(lambda: self.record("press", "trackball"))
+        trackball.interaction_finished.connect(lambda: self.record("release", "trackball"))
+        trackball.orientation_changed.connect(lambda q: self.record("orientation", "trackball", [q.w, q.x, q.y, q.z]))
+        for name in SLIDERS:
+            slider = getattr(docker.ui, name)
+            slider.sliderPressed.connect(lambda name=name: self.record("press", name))
+            slider.sliderReleased.connect(lambda name=name: self.record("release", name))
+            slider.valueChanged.connect(lambda v, name=name: self.record("value", name, v))
+        for name in TOGGLES:
+            getattr(docker.ui, name).toggled.connect(lambda v, name=name: self.record("toggle", name, v))
+
+    def record(self, event: str, target: str, value=None) -> None:
+        if self.file is None:
+            return
+        now = perf_counter()
+        if self.start is None:
+            self.start = now
+        entry = {"t": round(now - self.start, 6), "event": event, "target": target}
+        if value is not None:
+            entry["value"] = value
+        self._write(entry)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _write(self, entry: dict) -> None:
+        self.file.write(json.dumps(entry) + "\n")
+
+
+def read_events(path: str) -> tuple[dict, list[dict]]:
+    """The header and the events of a recorded session."""
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("format") != FORMAT:
+        raise ValueError(f"{path} is not a recorded docker session")
+    if lines[0].get("version") != VERSION:
+        raise ValueError(f"{path} has event format version {lines[0].get('version')}, expected {VERSION}")
+    return lines[0], lines[1:]
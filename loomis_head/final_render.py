@@ -0,0 +1,91 @@
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from .head_collection import BuiltHead
+from .loomis_head_generator import LoomisHead3D, samples_for_tolerance
+
+# Chord error of the saved guides, in document pixels. Far below what a
+# stroke can show, and a small head no longer pays for a fixed 1024 samples
+# while a huge one gets more.
+FINAL_TOLERANCE = 0.05
+FINAL_MAX_SAMPLES = 4096
+
+
+def build_final(head: LoomisHead3D, copy: LoomisHead3D, width: int, height: int, dash_back: str | None) -> BuiltHead:
+    """High-detail geometry of ``copy``, a snapshot of ``head``; runs on a worker thread."""
+    radius_px = copy.radius * copy.screen_scale(width, height)
+    samples = samples_for_tolerance(radius_px, FINAL_TOLERANCE, max_samples=FINAL_MAX_SAMPLES)
+    paths = copy.build_paths(width, height, samples)
+    return BuiltHead(head, paths, copy.svg_group(paths, dash_back), ("final", samples))
+
+
+class FinalRender(QObject):
+    """
+    The final, high-detail pass of ``save_head``, built in the background.
+
+    Every head is one task on a worker thread, built from a snapshot so the
+    docker's heads are never touched off the GUI thread. ``finished``
+    carries the ``BuiltHead`` list in head order once all tasks are done,
+    or None when cancelled; writing it into the document is left to the
+    GUI thread. A head whose build raises stops the pass: ``failed``
+    carries the error and ``finished`` is not emitted.
+    """
+
+    progress = pyqtSignal(int, int)  # heads built, total
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(
+        self,
+        heads: Sequence[LoomisHead3D],
+        width: int,
+        height: int,
+        dash_back: str | None = "8,8",
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.jobs = [(head, head.snapshot()) for head in heads]
+        self.width = width
+        self.height = height
+        self.dash_back = dash_back
+        self.pool: ThreadPoolExecutor | None = None
+        self.pending: deque[Future] = deque()
+        self.built: list[BuiltHead] = []
+        self.timer = QTimer(self)
+        self.timer.setInterval(15)
+        self.timer.timeout.connect(self._drain)
+
+    def start(self) -> None:
+        # one worker: the build is pure Python, more threads would only contend for the GIL
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        for head, copy in self.jobs:
+            self.pending.append(self.pool.submit(build_final, head, copy, self.width, self.height, self.dash_back))
+        self.progress.emit(0, len(self.jobs))
+        self.timer.start()
+
+    def cancel(self) -> None:
+        self._stop()
+        self.finished.emit(None)
+
+    def _drain(self) -> None:
+        while self.pending and self.pending[0].done():
+            error = self.pending[0].exception()
+            if error is not None:
+                self._stop()
+                self.failed.emit(f"{type(error).__name__}: {error}")
+                return
+            self.built.append(self.pending.popleft().result())
+            self.progress.emit(len(self.built), len(self.jobs))
+        if not self.pending:
+            self._stop()
+            self.finished.emit(self.built)
+
+    def _stop(self) -> None:
+        self.timer.stop()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        self.pending.clear()
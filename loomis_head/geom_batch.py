@@ -0,0 +1,110 @@
+from collections.abc import Sequence
+
+from .linalg import Quaternion
+
+try:
+    import numpy as np
+except ImportError:  # Krita does not bundle numpy on every platform
+    np = None
+
+
+def quaternion_array(qs: "Sequence[Quaternion] | np.ndarray") -> "np.ndarray":
+    """Normalized (N, 4) array of w, x, y, z from quaternions or an array-like of rows."""
+    if isinstance(qs, np.ndarray):
+        arr = qs.astype(np.float64).reshape(-1, 4)
+    else:
+        arr = np.array([(q.w, q.x, q.y, q.z) for q in qs], dtype=np.float64).reshape(-1, 4)
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    return arr / np.where(norms == 0.0, 1.0, norms)
+
+
+def rotation_matrices(quats: "np.ndarray") -> "np.ndarray":
+    """(N, 3, 3) rotation matrices of unit quaternions given as an (N, 4) array."""
+    w, x, y, z = quats.T
+    xx, yy, zz = x * x, y * y, z * z
+    xy, xz, yz = x * y, x * z, y * z
+    wx, wy, wz = w * x, w * y, w * z
+    return np.stack(
+        [
+            np.stack([1.0 - 2.0 * (yy + zz), 2.0 * (xy - wz), 2.0 * (xz + wy)], axis=-1),
+            np.stack([2.0 * (xy + wz), 1.0 - 2.0 * (xx + zz), 2.0 * (yz - wx)], axis=-1),
+            np.stack([2.0 * (xz - wy), 2.0 * (yz + wx), 1.0 - 2.0 * (xx + yy)], axis=-1),
+        ],
+        axis=-2,
+    )
+
+
+def rotate(rot: "np.ndarray", pts: "np.ndarray") -> "np.ndarray":
+    """Rotates (M, 3) points by every matrix of an (N, 3, 3) stack, giving (N, M, 3)."""
+    return np.einsum("nij,mj->nmi", rot, pts)
+
+
+def sign_flips(values: "np.ndarray", z_eps: float) -> tuple["np.ndarray", "np.ndarray", list[int]]:
+    """
+    Vectorized classification step of ``split_by_sign``: the snapped values,
+    the front mask and the indices where a run of one sign gives way to the other.
+    """
+    z = np.where(np.abs(values) < z_eps, 0.0, values)
+    front = z >= 0.0
+    flips = (np.flatnonzero(front[1:] != front[:-1]) + 1).tolist()
+    return z, front, flips
+
+
+def _intersect_x(p0: "np.ndarray", p1: "np.ndarray", xb: float, eps: float) -> "np.ndarray | None":
+    dx = p1[0] - p0[0]
+    if abs(dx) < eps:
+        return None
+    t = (xb - p0[0]) / dx
+    if 0.0 <= t <= 1.0:
+        return p0 + (p1 - p0) * t
+    return None
+
+
+def clip_to_side_band(pts: "np.ndarray", d: float, eps: float) -> list["np.ndarray"]:
+    """
+    ``geom_polyline.clip_to_side_band`` on an (S, 3) array. Inside/outside is
+    decided for all vertices at once; only the band crossings are visited in Python.
+    """
+    x = pts[:, 0]
+    inside = np.abs(x) <= d
+    x0, x1 = x[:-1], x[1:]
+    across = ~inside[:-1] & ~inside[1:] & (((x0 < -d) & (x1 > d)) | ((x0 > d) & (x1 < -d)))
+    events = (np.flatnonzero((inside[:-1] != inside[1:]) | across) + 1).tolist()
+
+    segs: list[np.ndarray] = []
+    start: int | None = 0 if inside[0] else None
+    opening: list[np.ndarray] = []
+    for i in events:
+        p_prev, p = pts[i - 1], pts[i]
+        if inside[i - 1]:
+            pc = _intersect_x(p_prev, p, d if x[i] > d else -d, eps)
+            segs.append(np.vstack(opening + [pts[start:i]] + ([pc] if pc is not None else [])))
+            start, opening = None, []
+        elif inside[i]:
+            pc = _intersect_x(p_prev, p, d if x[i - 1] > d else -d, eps)
+            start, opening = i, ([pc] if pc is not None else [])
+        else:
+            pa = _intersect_x(p_prev, p, -d, eps)
+            pb = _intersect_x(p_prev, p, d, eps)
+            if pa is not None and pb is not None:
+                segs.append(np.vstack([pa, pb]))
+    if start is not None:
+        segs.append(np.vstack(opening + [pts[start:]]))
+    return segs
+
+
+def circles_on_planes(
+    normals: "np.ndarray", centers: "np.ndarray", radius: float, cos_t: Sequence[float], sin_t: Sequence[float]
+) -> "np.ndarray":
+    """
+    ``LoomisHead3D._circle_on_plane`` for N planes at once: (N, 3) normals and
+    centers give (N, S, 3) points, with the same in-plane basis per normal.
+    """
+    nn = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+    axes = np.eye(3)[np.argmin(np.abs(nn), axis=1)]
+    u = np.cross(nn, axes)
+    u /= np.linalg.norm(u, axis=1, keepdims=True)
+    v = np.cross(nn, u)
+    c = np.asarray(cos_t, dtype=np.float64) * radius
+    s = np.asarray(sin_t, dtype=np.float64) * radius
+    return centers[:, None, :] + u[:, None, :] * c[None, :, None] + v[:, None, :] * s[None, :, None]
@@ -0,0 +1,162 @@
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+from .linalg import linspace
+
+CACHE_FILE_NAME = "loomis_head_geometry.bin"
+
+# Bump whenever the table layout or the way a table is computed changes.
+CACHE_VERSION = 1
+
+# Sample counts written on first run, so a warm start never has to compute
+# the tables the docker uses for live drawing and the final render.
+PRECOMPUTED_SAMPLES = (16, 24, 32, 48, 64, 96, 128, 192, 256, 384, 512, 768, 1024)
+
+_MAGIC = b"LMHC"
+_BYTE_ORDER = 1 if sys.byteorder == "little" else 2
+_HEADER = struct.Struct("<4sIII")  # magic, version, byte order, table count
+_ENTRY = struct.Struct("<IQ")  # samples, byte offset of the cos table
+
+
+TrigTable = tuple[Sequence[float], Sequence[float]]
+
+
+def _compute_trig(samples: int) -> TrigTable:
+    ts = linspace(0.0, 2.0 * math.pi, samples, endpoint=False)
+    return [math.cos(t) for t in ts], [math.sin(t) for t in ts]
+
+
+class GeometryCache:
+    """
+    Cos/sin tables of the unit circle, one pair per sample count.
+
+    Tables are memory-mapped from a versioned binary file so warm starts skip
+    the precomputation and several Krita windows share the same pages.
+    Missing tables are computed in-process and written back on ``save``.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path
+        self._tables: dict[int, TrigTable] = {}
+        self._mm: mmap.mmap | None = None
+        self._dirty = False
+
+    def trig(self, samples: int) -> TrigTable:
+        table = self._tables.get(samples)
+        if table is None:
+            table = _compute_trig(samples)
+            self._tables[samples] = table
+            self._dirty = True
+        return table
+
+    def load(self, path: str | None = None) -> bool:
+        if path is not None:
+            self.path = path
+        if not self.path or not os.path.isfile(self.path):
+            return False
+
+        try:
+            with open(self.path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        tables = self._read_tables(mm)
+        if tables is None:
+            mm.close()
+            return False
+
+        old, self._mm = self._mm, mm
+        self._tables.update(tables)
+        if old is not None:
+            self._release(old)
+        return True
+
+    def _release(self, mm: mmap.mmap) -> None:
+        """Copies the tables still served from ``mm`` out of it, then closes it."""
+        for samples, (cos_t, sin_t) in self._tables.items():
+            if isinstance(cos_t, memoryview) and cos_t.obj is mm:
+                self._tables[samples] = (cos_t.tolist(), sin_t.tolist())
+        try:
+            mm.close()
+        except BufferError:
+            pass  # a caller still holds one of its tables; the mapping goes with the last one
+
+    def _read_tables(self, mm: mmap.mmap) -> dict[int, TrigTable] | None:
+        if len(mm) < _HEADER.size:
+            return None
+        magic, version, byte_order, count = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC or version != CACHE_VERSION or byte_order != _BYTE_ORDER:
+            return None
+        if len(mm) < _HEADER.size + count * _ENTRY.size:
+            return None
+
+        tables: dict[int, TrigTable] = {}
+        for i in range(count):
+            samples, offset = _ENTRY.unpack_from(mm, _HEADER.size + i * _ENTRY.size)
+            nbytes = samples * 8
+            if offset + 2 * nbytes > len(mm):
+                return None
+            # memoryviews index to plain floats, which euclid insists on
+            view = memoryview(mm)[offset : offset + 2 * nbytes].cast("d")
+            tables[samples] = (view[:samples], view[samples:])
+        return tables
+
+    def save(self, path: str | None = None) -> bool:
+        if path is not None:
+            self.path = path
+        if not self.path or (not self._dirty and self._mm is not None):
+            return False
+
+        for samples in PRECOMPUTED_SAMPLES:
+            self.trig(samples)
+
+        items = sorted(self._tables.items())
+        offset = _HEADER.size + len(items) * _ENTRY.size
+        header = bytearray(_HEADER.pack(_MAGIC, CACHE_VERSION, _BYTE_ORDER, len(items)))
+        data = bytearray()
+        for samples, (cos_t, sin_t) in items:
+            header += _ENTRY.pack(samples, offset + len(data))
+            data += array("d", cos_t).tobytes()
+            data += array("d", sin_t).tobytes()
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(header)
+                f.write(data)
+            # Another Krita window may still map the old file, which makes the
+            # rename fail on Windows. The cache is best effort, so keep going.
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        self._dirty = False
+        return True
+
+
+_default_cache = GeometryCache()
+
+
+def default_cache() -> GeometryCache:
+    return _default_cache
+
+
+def trig_table(samples: int) -> TrigTable:
+    return _default_cache.trig(samples)
+
+
+def install(directory: str) -> GeometryCache:
+    """Loads (or creates) the on-disk cache inside ``directory``."""
+    path = os.path.join(directory, CACHE_FILE_NAME)
+    if not _default_cache.load(path):
+        _default_cache.save(path)
+    return _default_cache
@@ -11,78 +11,82 @@ def _lerp3(p0: Vector3, p1: Vector3, t: float) -> Vector3:
     return p0 + (p1 - p0) * t
 
 
-def path_str(xy: Sequence[Vector2]) -> str:
+def path_str(xy: Sequence[Vector2], precision: int = 3) -> str:
+    """SVG path data through ``xy``, coordinates rounded to ``precision`` decimals."""
     if not xy:
         return ""
 
-    parts = [f"M {xy[0].x:.3f},{xy[0].y:.3f}"]
-
-    for i in range(1, len(xy)):
-        parts.append(f"L {xy[i].x:.3f},{xy[i].y:.3f}")
+    move = f"M {{:.{precision}f}},{{:.{precision}f}}".format
+    line = f"L {{:.{precision}f}},{{:.{precision}f}}".format
+    parts = [move(xy[0].x, xy[0].y)]
+    parts += [line(p.x, p.y) for p in xy[1:]]
 
     return " ".join(parts) + " "
 
 
+def parse_dash(dash_back: str | None) -> list[float]:
+    return [float(v) for v in dash_back.split(",")] if dash_back else []
+
+
 def split_front_back(
     pts_cam: Sequence[Vector3],
     z_eps: float = EPS,
 ) -> tuple[Segments3, Segments3]:
-    n = len(pts_cam)
+    return split_by_sign(pts_cam, [p.z for p in pts_cam], z_eps)
+
+
+def split_by_sign(
+    pts: Sequence[Vector3],
+    values: Sequence[float],
+    z_eps: float = EPS,
+) -> tuple[Segments3, Segments3]:
+    """
+    Splits ``pts`` into runs where ``values`` is >= 0 (front) and < 0 (back),
+    cutting each run at the linearly interpolated zero crossing.
+    """
+    n = len(pts)
     if n < 2:
         return [], []
 
-    z = [0.0 if abs(p.z) < z_eps else p.z for p in pts_cam]
+    z = [0.0 if abs(v) < z_eps else v for v in values]
+    is_front = [v >= 0.0 for v in z]
+    # Runs between crossings are copied as slices; only the few crossings
+    # are visited one by one.
+    flips = [i for i, (a, b) in enumerate(zip(is_front, is_front[1:]), 1) if a != b]
 
     front: Segments3 = []
     back: Segments3 = []
-    buf: Poly3 = []
-    is_front: bool | None = None
-
-    def push(seg: Poly3, flag: bool | None) -> None:
-        if flag is None:
-            return
-        if len(seg) >= 2:
-            if flag:
-                front.append(list(seg))
-            else:
-                back.append(list(seg))
-
-    for i in range(n):
-        pi, zi = pts_cam[i], z[i]
-        if i == 0:
-            buf = [pi]
-            is_front = zi >= 0.0
-            continue
-
-        pj, zj = pts_cam[i - 1], z[i - 1]
-
-        if zj == 0.0 and zi == 0.0:
-            buf.append(pi)
-            continue
-
-        flip = (zj >= 0.0) != (zi >= 0.0)
-        if flip:
-            denom = zj - zi
-            if abs(denom) < EPS:
-                pc = pj
-            else:
-                t = zj / denom
-                if t < 0.0:
-                    t = 0.0
-                elif t > 1.0:
-                    t = 1.0
-                pc = _lerp3(pj, pi, float(t))
-            buf.append(pc)
-            push(buf, is_front)
-            buf = [pc, pi]
-            is_front = zi >= 0.0
+    start = 0
+    opening: Poly3 = []
+    for i in flips:
+        pj, zj = pts[i - 1], z[i - 1]
+        denom = zj - z[i]
+        if abs(denom) < EPS:
+            pc = pj
         else:
-            buf.append(pi)
-
-    push(buf, is_front)
+            t = zj / denom
+            if t < 0.0:
+                t = 0.0
+            elif t > 1.0:
+                t = 1.0
+            pc = _lerp3(pj, pts[i], float(t))
+        (front if is_front[start] else back).append(opening + list(pts[start:i]) + [pc])
+        opening = [pc]
+        start = i
+
+    (front if is_front[start] else back).append(opening + list(pts[start:]))
     return front, back
 
 
+def sphere_facing(pts_cam: Sequence[Vector3], eye_z: float) -> list[float]:
+    """
+    Signed visibility of points on a sphere centered at the origin, seen from
+    an eye at (0, 0, eye_z): ``n . (eye - p)`` with ``n = p``. Positive values
+    face the eye; for an eye at infinity this reduces to the sign of ``p.z``.
+    """
+    return [p.z * eye_z - (p.x * p.x + p.y * p.y + p.z * p.z) for p in pts_cam]
+
+
 def clip_to_side_band(poly_head: Sequence[Vector3], d: float) -> Segments3:
     segs: Segments3 = []
     n = len(poly_head)
@@ -147,7 +151,22 @@ def clip_to_side_band(poly_head: Sequence[Vector3], d: float) -> Segments3:
 def split_by_plane_facing(
     pts_cam: Sequence[Vector3],
     plane_normal_cam: Vector3,
+    eye_z: float | None = None,
 ) -> tuple[Segments3, Segments3]:
+    if eye_z is not None:
+        # Under perspective the plane faces the eye when n . (eye - p) > 0.
+        # That value is the same for every point p of the plane, so one point
+        # decides for all; an edge-on plane is split like the sphere itself.
+        if len(pts_cam) < 2:
+            return [], []
+        n, p = plane_normal_cam, pts_cam[0]
+        facing = n.z * eye_z - (n.x * p.x + n.y * p.y + n.z * p.z)
+        if facing > EPS:
+            return [list(pts_cam)], []
+        if facing < -EPS:
+            return [], [list(pts_cam)]
+        return split_by_sign(pts_cam, sphere_facing(pts_cam, eye_z))
+
     nz = float(plane_normal_cam.z)
     if nz > EPS:
         return [list(pts_cam)], []
@@ -0,0 +1,112 @@
+from collections.abc import Iterator
+from typing import NamedTuple
+
+from .geom_batch import np
+from .loomis_head_generator import HeadPaths, LoomisHead3D, samples_for_tolerance, wrap_svg
+
+
+class BuiltHead(NamedTuple):
+    head: LoomisHead3D
+    paths: HeadPaths
+    svg_group: str | None  # None when built with svg=False
+    key: tuple  # compare against a previously emitted key to skip unchanged heads
+
+
+class HeadCollection:
+    """
+    The heads placed on one document, each with its own center, scale and
+    orientation.
+
+    ``build`` rebuilds only the heads whose parameters changed since the
+    previous pass; the others are served from cache, so editing one head
+    never rebuilds the rest. With NumPy the heads to rebuild that share
+    their geometry settings and sample count are rotated and projected
+    together through ``LoomisHead3D.build_heads``. Without NumPy, and for a
+    group of one, each head is built on its own by ``build_paths``.
+
+    Per-head data is keyed on the head object, never on ``id(head)``: an id
+    is reused once its head is gone, and the new head would inherit the
+    stale entry.
+    """
+
+    def __init__(self) -> None:
+        self.heads: list[LoomisHead3D] = [LoomisHead3D()]
+        self._cache: dict[LoomisHead3D, BuiltHead] = {}
+        self.hits = 0  # heads served from cache by build, since creation
+
+    def __len__(self) -> int:
+        return len(self.heads)
+
+    def __getitem__(self, index: int) -> LoomisHead3D:
+        return self.heads[index]
+
+    def __iter__(self) -> Iterator[LoomisHead3D]:
+        return iter(self.heads)
+
+    def add(self, template: LoomisHead3D | None = None) -> LoomisHead3D:
+        head = LoomisHead3D()
+        if template is not None:
+            head.copy_style(template)
+            head.set_scale(template.scale)
+        self.heads.append(head)
+        return head
+
+    def remove(self, head: LoomisHead3D) -> None:
+        self.heads.remove(head)
+        self._cache.pop(head, None)
+
+    def build(
+        self,
+        width: float,
+        height: float,
+        dash_back: str | None = "5,6",
+        samples: int = 256,
+        tolerance: float | None = None,
+        precision: int = 3,
+        back_lines: bool = True,
+        svg: bool = True,
+    ) -> list[BuiltHead]:
+        """
+        With a ``tolerance`` (in pixels) each head gets the fewest samples that
+        keep its circles within it, capped at ``samples``; small heads in a
+        crowd then cost a fraction of a close-up one. ``precision`` and
+        ``back_lines`` trade SVG detail for speed, see ``quality.Quality``.
+        With ``svg`` False the SVG is left out until a later build asks for
+        it, as frames that only paint ``paths`` never read it.
+
+        Heads to rebuild are grouped by ``geometry_key`` and sample count,
+        one batch per group, see the class docstring.
+        """
+        out: list[BuiltHead | None] = []
+        batches: dict[tuple, list[tuple[int, tuple]]] = {}  # heads to rebuild, by geometry and samples
+        for i, head in enumerate(self.heads):
+            n = samples
+            if tolerance is not None:
+                n = min(samples, samples_for_tolerance(head.radius * head.screen_scale(width, height), tolerance))
+            key = (head.state_key(), width, height, dash_back, n, precision, back_lines)
+            built = self._cache.get(head)
+            if built is not None and built.key == key:
+                self.hits += 1
+                if svg and built.svg_group is None:
+                    built = self._cache[head] = built._replace(svg_group=head.svg_group(built.paths, dash_back, precision))
+                out.append(built)
+            else:
+                out.append(None)
+                batches.setdefault((head.geometry_key(), n), []).append((i, key))
+
+        for (_, n), batch in batches.items():
+            heads = [self.heads[i] for i, _ in batch]
+            if np is not None and len(heads) > 1:
+                all_paths = heads[0].build_heads(heads, width, height, n)
+            else:
+                all_paths = [head.build_paths(width, height, n) for head in heads]
+            for (i, key), head, paths in zip(batch, heads, all_paths):
+                if not back_lines:
+                    paths = paths._replace(back=[])
+                svg_group = head.svg_group(paths, dash_back, precision) if svg else None
+                out[i] = self._cache[head] = BuiltHead(head, paths, svg_group, key)
+        return out
+
+    def build_svg(self, width: float, height: float, dash_back: str | None = "5,6", samples: int = 256) -> str:
+        """All heads as one SVG document, for a single shared layer."""
+        return wrap_svg("".join(b.svg_group for b in self.build(width, height, dash_back, samples)))
@@ -1,3 +1,4 @@
+import math
 from collections.abc import Sequence
 from typing import TypeAlias
 
@@ -5,6 +6,7 @@ from .euclid import Matrix4, Quaternion, Vector2, Vector3
 
 Poly2: TypeAlias = list[Vector2]
 Poly3: TypeAlias = list[Vector3]
+Segments2: TypeAlias = list[Poly2]
 Segments3: TypeAlias = list[Poly3]
 Mat3: TypeAlias = list[list[float]]
 
@@ -34,6 +36,61 @@ def q_axis_angle(axis_xyz: Vector3 | Sequence[float], angle_rad: float) -> Quate
     return Quaternion.new_rotate_axis(angle_rad, ax)
 
 
+def q_slerp(a: Quaternion, b: Quaternion, t: float) -> Quaternion:
+    """
+    Shortest-path spherical interpolation from ``a`` (t = 0) to ``b`` (t = 1).
+    ``Quaternion.new_interpolate`` conjugates instead of negating across
+    hemispheres and snaps to ``b`` for small angles, so both cases are
+    handled here and only the regular case is passed on.
+    """
+    if a.w * b.w + a.x * b.x + a.y * b.y + a.z * b.z < 0.0:
+        b = Quaternion(-b.w, -b.x, -b.y, -b.z)
+    if (a.w - b.w) ** 2 + (a.x - b.x) ** 2 + (a.y - b.y) ** 2 + (a.z - b.z) ** 2 < 1e-3:
+        return Quaternion(a.w + (b.w - a.w) * t, a.x + (b.x - a.x) * t, a.y + (b.y - a.y) * t, a.z + (b.z - a.z) * t).normalized()
+    return Quaternion.new_interpolate(a, b, t).normalized()
+
+
+def q_between(a: Vector3, b: Vector3) -> Quaternion:
+    """Shortest-arc rotation taking direction ``a`` onto direction ``b``."""
+    a = normalize(a)
+    b = normalize(b)
+    d = a.dot(b)
+    if d < -1.0 + 1e-9:
+        # opposite directions: any axis perpendicular to a will do
+        axis = a.cross(Vector3(1.0, 0.0, 0.0))
+        if axis.magnitude_squared() < 1e-12:
+            axis = a.cross(Vector3(0.0, 1.0, 0.0))
+        return Quaternion.new_rotate_axis(math.pi, normalize(axis))
+    c = a.cross(b)
+    return Quaternion(1.0 + d, c.x, c.y, c.z).normalized()
+
+
+def q_from_yaw_pitch_roll(yaw: float, pitch: float, roll: float) -> Quaternion:
+    """
+    Closed form of ``q_axis_angle(fwd, roll) * q_axis_angle(Y, yaw) * q_axis_angle(X, pitch)``
+    where ``fwd`` is +Z after the turn. Rolling around the turned forward axis
+    is the same as rolling around Z first, so this is Ry * Rx * Rz.
+    """
+    cy, sy = math.cos(yaw * 0.5), math.sin(yaw * 0.5)
+    cx, sx = math.cos(pitch * 0.5), math.sin(pitch * 0.5)
+    cz, sz = math.cos(roll * 0.5), math.sin(roll * 0.5)
+    return Quaternion(
+        cy * cx * cz + sy * sx * sz,
+        cy * sx * cz + sy * cx * sz,
+        sy * cx * cz - cy * sx * sz,
+        cy * cx * sz - sy * sx * cz,
+    )
+
+
+def q_to_yaw_pitch_roll(q: Quaternion) -> tuple[float, float, float]:
+    """Inverse of ``q_from_yaw_pitch_roll``."""
+    m = q_to_mat3(q_normalize(q))
+    yaw = math.atan2(m[0][2], m[2][2])
+    pitch = -math.asin(max(-1.0, min(1.0, m[1][2])))
+    roll = math.atan2(m[1][0], m[1][1])
+    return yaw, pitch, roll
+
+
 def q_to_mat3(q: Quaternion) -> Mat3:
     m4: Matrix4 = q.get_matrix()
     r0 = [m4.a, m4.b, m4.c]
@@ -1,25 +1,151 @@
 import math
+from bisect import bisect_left, bisect_right
 from collections.abc import Sequence
-
-from .euclid import Vector2, Vector3
+from time import perf_counter
+from typing import NamedTuple
+
+from . import geom_batch
+from .build_stats import BuildRecord, BuildStats
+from .euclid import Matrix4, Vector2, Vector3
+from .geom_batch import np, quaternion_array, rotate, rotation_matrices, sign_flips
+from .geom_cache import PRECOMPUTED_SAMPLES, trig_table
 from .geom_polyline import (
     EPS,
     clip_to_side_band,
     path_str,
+    sphere_facing,
     split_by_plane_facing,
+    split_by_sign,
     split_front_back,
 )
 from .linalg import (
     Poly2,
     Poly3,
     Quaternion,
-    linspace,
+    Segments2,
+    Segments3,
     normalize,
+    q_from_yaw_pitch_roll,
     q_identity,
     q_normalize,
 )
 
 
+def samples_for_tolerance(radius_px: float, tolerance_px: float, min_samples: int = 16, max_samples: int = 4096) -> int:
+    """
+    Fewest circle samples whose chords stay within ``tolerance_px`` of a circle
+    of ``radius_px``, rounded up to a sample count the trig cache precomputes.
+    """
+    if radius_px <= tolerance_px:
+        return min_samples
+    n = math.ceil(math.pi / math.acos(1.0 - tolerance_px / radius_px))
+    n = max(min_samples, min(max_samples, n))
+    return next((c for c in PRECOMPUTED_SAMPLES if c >= n), n)
+
+
+def wrap_svg(body: str) -> str:
+    return f'<svg xmlns="http://www.w3.org/2000/svg">{body}</svg>'
+
+
+class HeadPaths(NamedTuple):
+    """Screen-space polylines of one head, ready to be stroked."""
+
+    front: Segments2
+    back: Segments2
+    arrow: Segments2
+
+    def bounds(self) -> tuple[float, float, float, float] | None:
+        """(x0, y0, x1, y1) of every vertex, or None when nothing is drawn."""
+        xs = [p.x for segs in self for seg in segs for p in seg]
+        if not xs:
+            return None
+        ys = [p.y for segs in self for seg in segs for p in seg]
+        return min(xs), min(ys), max(xs), max(ys)
+
+
+class Camera(NamedTuple):
+    """Eye on the +Z axis of camera space and its view-projection matrix."""
+
+    eye_z: float
+    matrix: Matrix4
+
+
+def focal_length_to_fov(focal_length: float) -> float:
+    """Vertical field of view of a 35 mm-equivalent lens (24 mm frame height)."""
+    return 2.0 * math.atan(12.0 / focal_length)
+
+
+class View(NamedTuple):
+    """One projection of the head: an orientation and the canvas rectangle it fills."""
+
+    q: Quaternion
+    x: float
+    y: float
+    width: float
+    height: float
+
+
+# Fixed views of a character sheet, as orientations of the head.
+SHEET_VIEWS: dict[str, Quaternion] = {
+    "front": q_identity(),
+    "three-quarter": q_from_yaw_pitch_roll(math.radians(45.0), 0.0, 0.0),
+    "side": q_from_yaw_pitch_roll(math.radians(90.0), 0.0, 0.0),
+    "top": q_from_yaw_pitch_roll(0.0, math.radians(90.0), 0.0),
+}
+
+
+def sheet_views(width: float, height: float, extra: Sequence[Quaternion] = (), names: Sequence[str] = tuple(SHEET_VIEWS)) -> list[View]:
+    """Lays ``extra`` poses followed by the named sheet views out in one row of equal cells."""
+    poses = list(extra) + [SHEET_VIEWS[name] for name in names]
+    if not poses:
+        return []
+    cell_w = width / len(poses)
+    return [View(q, i * cell_w, 0.0, cell_w, height) for i, q in enumerate(poses)]
+
+
+def _silhouette_runs(xs: list[float], inside: list[bool], screen: list[Vector2], d: float) -> Segments2:
+    """
+    ``clip_to_side_band`` on the projected orthographic silhouette of one
+    head, given the head-space x of its points. The projection is affine, so
+    band crossings are interpolated on screen. The silhouette lies in the
+    plane facing the viewer, so all of it is front, as ``split_front_back``
+    has it after snapping.
+    """
+
+    def band_point(i: int, xb: float) -> Vector2 | None:
+        dx = xs[i] - xs[i - 1]
+        if abs(dx) < EPS:
+            return None
+        t = (xb - xs[i - 1]) / dx
+        if not 0.0 <= t <= 1.0:
+            return None
+        a, b = screen[i - 1], screen[i]
+        return Vector2(a.x + (b.x - a.x) * t, a.y + (b.y - a.y) * t)
+
+    runs: Segments2 = []
+    cur: Poly2 | None = [screen[0]] if inside[0] else None
+    for i in range(1, len(xs)):
+        x0, x1 = xs[i - 1], xs[i]
+        if inside[i - 1] and inside[i]:
+            cur.append(screen[i])
+        elif inside[i - 1]:
+            pc = band_point(i, d if x1 > d else -d)
+            if pc is not None:
+                cur.append(pc)
+            runs.append(cur)
+            cur = None
+        elif inside[i]:
+            pc = band_point(i, d if x0 > d else -d)
+            cur = ([pc] if pc is not None else []) + [screen[i]]
+        elif (x0 < -d and x1 > d) or (x0 > d and x1 < -d):
+            pa, pb = band_point(i, -d), band_point(i, d)
+            if pa is not None and pb is not None:
+                runs.append([pa, pb])
+    if cur is not None:
+        runs.append(cur)
+    return [run for run in runs if len(run) >= 2]
+
+
 class LoomisHead3D:
     def __init__(self) -> None:
         self.radius: float = 1.0
@@ -32,7 +158,15 @@ class LoomisHead3D:
         self.show_side_rims: bool = True
         self.show_side_cross: bool = True
         self.stroke_color: str = "#6A54E7"
+        self.center: tuple[float, float] = (0.5, 0.5)  # in canvas fractions
+        self.perspective: bool = False
+        self.focal_length: float = 50.0  # mm, 35 mm equivalent
         self.q: Quaternion = q_identity()
+        self._geometry_cache: tuple[tuple, list[tuple[list[Poly3], Vector3 | None]]] | None = None
+        self._packed_cache: tuple[list, tuple] | None = None
+        # Per-stage measurements of build_views and svg_group, see BuildStats.
+        self.stats: BuildStats | None = None
+        self._record: BuildRecord | None = None  # the build in progress while stats are on
 
     def set_quaternion(self, q: Quaternion) -> None:
         self.q = q_normalize(q)
@@ -40,6 +174,9 @@ class LoomisHead3D:
     def set_scale(self, scale: float) -> None:
         self.scale = scale
 
+    def set_center(self, x: float, y: float) -> None:
+        self.center = (x, y)
+
     def set_sidecut(self, side_cut: float) -> None:
         self.side_cut = side_cut
 
@@ -64,6 +201,75 @@ class LoomisHead3D:
     def set_stroke_color(self, color: str) -> None:
         self.stroke_color = color
 
+    def set_perspective(self, enable: bool) -> None:
+        self.perspective = enable
+
+    def set_focal_length(self, focal_length: float) -> None:
+        self.focal_length = max(1.0, focal_length)
+
+    def copy_style(self, other: "LoomisHead3D") -> None:
+        """Takes over every guide setting of ``other`` except orientation and scale."""
+        self.radius = other.radius
+        self.side_cut = other.side_cut
+        self.front_line_stroke = other.front_line_stroke
+        self.back_line_stroke = other.back_line_stroke
+        self.show_arrow = other.show_arrow
+        self.show_silhouette = other.show_silhouette
+        self.show_side_rims = other.show_side_rims
+        self.show_side_cross = other.show_side_cross
+        self.stroke_color = other.stroke_color
+        self.perspective = other.perspective
+        self.focal_length = other.focal_length
+
+    def snapshot(self) -> "LoomisHead3D":
+        """A copy of every setting with caches of its own, to build from on another thread."""
+        copy = LoomisHead3D()
+        copy.copy_style(self)
+        copy.set_scale(self.scale)
+        copy.set_center(*self.center)
+        copy.q = self.q
+        return copy
+
+    def state_key(self) -> tuple:
+        """Hashable snapshot of everything that affects the generated guides."""
+        q = self.q
+        return (
+            q.w,
+            q.x,
+            q.y,
+            q.z,
+            self.radius,
+            self.scale,
+            self.center,
+            self.side_cut,
+            self.front_line_stroke,
+            self.back_line_stroke,
+            self.show_arrow,
+            self.show_silhouette,
+            self.show_side_rims,
+            self.show_side_cross,
+            self.stroke_color,
+            self.perspective,
+            self.focal_length,
+        )
+
+    def geometry_key(self) -> tuple:
+        """
+        The settings that shape the guides apart from orientation, center and
+        scale. Heads that agree on it can be built in one batch, see
+        ``build_heads``.
+        """
+        return (
+            self.radius,
+            self.side_cut,
+            self.show_arrow,
+            self.show_silhouette,
+            self.show_side_rims,
+            self.show_side_cross,
+            self.perspective,
+            self.focal_length,
+        )
+
     def _basis_from_nnormal(self, n: Vector3 | Sequence[float]) -> tuple[Vector3, Vector3]:
         nn = n if isinstance(n, Vector3) else Vector3(*n)
         nn = normalize(nn)
@@ -84,151 +290,594 @@ class LoomisHead3D:
     ) -> Poly3:
         u, v = self._basis_from_nnormal(normal)
         cx, cy, cz = center
+        cos_t, sin_t = trig_table(samples)
         pts: Poly3 = []
-        for t in linspace(0.0, 2.0 * math.pi, samples, endpoint=False):
-            c, s = math.cos(t), math.sin(t)
+        for c, s in zip(cos_t, sin_t):
             p = Vector3(cx, cy, cz) + u * (c * radius) + v * (s * radius)
             pts.append(p)
         return pts
 
-    def _to_camera(self, pts: Sequence[Vector3]) -> Poly3:
-        q = self.q
+    def _curve(self, normal: Vector3, center: Sequence[float], radius: float, samples: int) -> Poly3:
+        record = self._record
+        if record is None:
+            return self._circle_on_plane(normal, center, radius, samples)
+        t0 = perf_counter()
+        pts = self._circle_on_plane(normal, center, radius, samples)
+        record.add("curves", t0, 0, len(pts), 1)
+        return pts
+
+    def _clip(self, poly: Poly3, d: float) -> Segments3:
+        record = self._record
+        if record is None:
+            return clip_to_side_band(poly, d)
+        t0 = perf_counter()
+        segs = clip_to_side_band(poly, d)
+        record.add("clipping", t0, len(poly), sum(map(len, segs)), len(segs))
+        return segs
+
+    def _to_camera(self, pts: Sequence[Vector3], q: Quaternion | None = None) -> Poly3:
+        # Quaternion.__mul__(Vector3) with the per-quaternion products hoisted
+        # out of the loop: the same expressions in the same order, so the same bits.
+        q = self.q if q is None else q
+        w, x, y, z = q.w, q.x, q.y, q.z
+        ww = w * w
+        w2 = w * 2
+        wx2 = w2 * x
+        wy2 = w2 * y
+        wz2 = w2 * z
+        xx = x * x
+        x2 = x * 2
+        xy2 = x2 * y
+        xz2 = x2 * z
+        yy = y * y
+        yz2 = 2 * y * z
+        zz = z * z
         out: Poly3 = []
         for p in pts:
-            pv = q * p
-            out.append(pv)
+            vx, vy, vz = p.x, p.y, p.z
+            out.append(
+                Vector3(
+                    ww * vx + wy2 * vz - wz2 * vy + xx * vx + xy2 * vy + xz2 * vz - zz * vx - yy * vx,
+                    xy2 * vx + yy * vy + yz2 * vz + wz2 * vx - zz * vy + ww * vy - wx2 * vz - xx * vy,
+                    xz2 * vx + yz2 * vy + zz * vz - wy2 * vx - yy * vz + wx2 * vy - xx * vz + ww * vz,
+                )
+            )
         return out
 
+    def screen_scale(self, w: float, h: float) -> float:
+        """Pixels per unit of head space on a ``w`` x ``h`` canvas."""
+        return min(w, h) * 0.3 * self.scale
+
+    def _camera(self, w: float, h: float) -> Camera | None:
+        """
+        Perspective camera looking at the head center, or None for the
+        orthographic view. The eye distance is chosen so the silhouette keeps
+        the size the orthographic view gives it: a short lens and a big head
+        put the eye close and exaggerate perspective, like a real close-up.
+        """
+        if not self.perspective or h <= 0:
+            return None
+        r = self.radius
+        fov_y = focal_length_to_fov(self.focal_length)
+        focal_px = 0.5 * h / math.tan(0.5 * fov_y)
+        eye_z = r * math.sqrt(1.0 + (focal_px / max(self.screen_scale(w, h), EPS)) ** 2)
+
+        proj = Matrix4.new_perspective(fov_y, w / h, 0.01 * r, eye_z + 2.0 * r)
+        # new_look_at returns the camera-to-world transform; invert for world-to-camera.
+        view = Matrix4.new_look_at(Vector3(0.0, 0.0, eye_z), Vector3(0.0, 0.0, 0.0), Vector3(0.0, 1.0, 0.0)).inverse()
+        return Camera(eye_z, proj * view)
+
     def _to_screen(
         self,
         pts_cam: Sequence[Vector3],
-        w: float,
-        h: float,
+        view: View,
+        camera: Camera | None = None,
     ) -> Poly2:
-        cx_val = w * 0.5
-        cy_val = h * 0.5
-        s = min(w, h) * 0.3 * self.scale
+        w, h = view.width, view.height
+        cx_val = view.x + w * self.center[0]
+        cy_val = view.y + h * self.center[1]
         xy: Poly2 = []
+        if camera is None:
+            s = self.screen_scale(w, h)
+            for p in pts_cam:
+                x_s = p.x * s + cx_val
+                y_s = cy_val - p.y * s
+                xy.append(Vector2(x_s, y_s))
+            return xy
+
+        m = camera.matrix
+        ma, mb, mc, md = m.a, m.b, m.c, m.d
+        me, mf, mg, mh = m.e, m.f, m.g, m.h
+        mm, mn, mo, mp = m.m, m.n, m.o, m.p
+        half_w = w * 0.5
+        half_h = h * 0.5
         for p in pts_cam:
-            x_s = p.x * s + cx_val
-            y_s = cy_val - p.y * s
+            cw = max(mm * p.x + mn * p.y + mo * p.z + mp, EPS)
+            x_s = (ma * p.x + mb * p.y + mc * p.z + md) / cw * half_w + cx_val
+            y_s = cy_val - (me * p.x + mf * p.y + mg * p.z + mh) / cw * half_h
             xy.append(Vector2(x_s, y_s))
         return xy
 
-    def _emit_segments(
+    def _split_segments(
         self,
         segments: list[Poly3],
-        width: float,
-        height: float,
-        front_paths: list[str],
-        back_paths: list[str],
+        q: Quaternion,
+        front: Segments3,
+        back: Segments3,
         plane_normal_cam: Vector3 | None = None,
+        camera: Camera | None = None,
     ) -> None:
+        record = self._record
         for segment in segments:
-            segment_camera = self._to_camera(segment)
-            if plane_normal_cam is None:
+            if record is not None:
+                t0 = perf_counter()
+            segment_camera = self._to_camera(segment, q)
+            if record is not None:
+                t0 = record.add("rotation", t0, len(segment), len(segment_camera), 1)
+            if camera is not None and plane_normal_cam is None:
+                fsegs, bsegs = split_by_sign(segment_camera, sphere_facing(segment_camera, camera.eye_z))
+            elif camera is not None:
+                fsegs, bsegs = split_by_plane_facing(segment_camera, plane_normal_cam, camera.eye_z)
+            elif plane_normal_cam is None:
                 fsegs, bsegs = split_front_back(segment_camera)
             else:
                 fsegs, bsegs = split_by_plane_facing(segment_camera, plane_normal_cam)
-            for s in bsegs:
-                back_paths.append(path_str(self._to_screen(s, width, height)))
-            for s in fsegs:
-                front_paths.append(path_str(self._to_screen(s, width, height)))
-
-    def build_svg(self, width: float, height: float, dash_back: str | None = "5,6", samples: int = 256) -> str:
+            if record is not None:
+                out = fsegs + bsegs
+                record.add("split", t0, len(segment_camera), sum(map(len, out)), len(out))
+            back.extend(bsegs)
+            front.extend(fsegs)
+
+    def _side_cut(self) -> tuple[float, float]:
+        """Distance of the side planes from the center and radius of the rims they cut."""
         r = self.radius
         d = max(0.05, min(0.9, float(self.side_cut))) * r
-        rim_r = math.sqrt(max(r * r - d * d, EPS))
+        return d, math.sqrt(max(r * r - d * d, EPS))
+
+    def _head_geometry(self, samples: int) -> list[tuple[list[Poly3], Vector3 | None]]:
+        """
+        View-independent guides in head space, already clipped to the side
+        band, each with the normal of the side plane it lies on (None for
+        curves on the sphere). Cached, so any number of views reuse one pass.
+        """
+        key = (samples, self.radius, self.side_cut, self.show_side_rims, self.show_side_cross)
+        cached = self._geometry_cache
+        if cached is not None and cached[0] == key:
+            if self._record is not None:
+                self._record.geometry_cached = True
+            return cached[1]
 
+        r = self.radius
+        d, rim_r = self._side_cut()
         nx = Vector3(1.0, 0.0, 0.0)
         ny = Vector3(0.0, 1.0, 0.0)
 
-        n_view = Vector3(0.0, 0.0, 1.0)
-        n_sil_head = self.q.conjugated() * n_view
-
-        n_plus_cam = self.q * nx
-        n_minus_cam = self.q * (-nx)
+        pieces: list[tuple[list[Poly3], Vector3 | None]] = [
+            (self._clip(self._curve(nx, [0.0, 0.0, 0.0], r, samples), d), None),  # centerline
+            (self._clip(self._curve(ny, [0.0, 0.0, 0.0], r, samples), d), None),  # equator
+        ]
 
-        curves: list[Poly3] = []
+        if self.show_side_rims:
+            pieces.append(([self._curve(nx, [d, 0.0, 0.0], rim_r, samples)], nx))
+            pieces.append(([self._curve(nx, [-d, 0.0, 0.0], rim_r, samples)], -nx))
 
-        if self.show_silhouette:
-            curves.append(self._circle_on_plane(n_sil_head, [0.0, 0.0, 0.0], r, samples))
+        if self.show_side_cross:
+            pieces.append(
+                (
+                    [
+                        [Vector3(d, -rim_r, 0.0), Vector3(d, rim_r, 0.0)],
+                        [Vector3(d, 0.0, -rim_r), Vector3(d, 0.0, rim_r)],
+                    ],
+                    nx,
+                )
+            )
+            pieces.append(
+                (
+                    [
+                        [Vector3(-d, -rim_r, 0.0), Vector3(-d, rim_r, 0.0)],
+                        [Vector3(-d, 0.0, -rim_r), Vector3(-d, 0.0, rim_r)],
+                    ],
+                    -nx,
+                )
+            )
 
-        curves.append(self._circle_on_plane(nx, [0.0, 0.0, 0.0], r, samples))  # centerline
-        curves.append(self._circle_on_plane(ny, [0.0, 0.0, 0.0], r, samples))  # equator
+        self._geometry_cache = (key, pieces)
+        return pieces
 
-        rims_plus: list[Poly3] = []
-        rims_minus: list[Poly3] = []
+    def _split_silhouette(self, q: Quaternion, camera: Camera | None, samples: int, front: Segments3, back: Segments3) -> None:
+        r = self.radius
+        d, _ = self._side_cut()
+        n_sil_head = q.conjugated() * Vector3(0.0, 0.0, 1.0)
+        if camera is None:
+            silhouette = self._curve(n_sil_head, [0.0, 0.0, 0.0], r, samples)
+        else:
+            # Tangent circle of the view cone: the eye sees the sphere up to
+            # the circle at distance r^2/D from the center, radius r*sqrt(1 - r^2/D^2).
+            k = r / camera.eye_z
+            c = n_sil_head * (r * k)
+            silhouette = self._curve(n_sil_head, [c.x, c.y, c.z], r * math.sqrt(1.0 - k * k), samples)
+        self._split_segments(self._clip(silhouette, d), q, front, back, None, camera)
+
+    def _split_view(
+        self, pieces: list[tuple[list[Poly3], Vector3 | None]], q: Quaternion, camera: Camera | None, samples: int
+    ) -> tuple[Segments3, Segments3]:
+        """Front and back runs of every guide in camera space."""
+        front: Segments3 = []
+        back: Segments3 = []
+        if self.show_silhouette:
+            self._split_silhouette(q, camera, samples, front, back)
+        for segments, normal in pieces:
+            normal_cam = None if normal is None else q * normal
+            self._split_segments(segments, q, front, back, normal_cam, camera)
+        return front, back
 
-        if self.show_side_rims:
-            rims_plus.append(self._circle_on_plane(nx, [d, 0.0, 0.0], rim_r, samples))
-            rims_minus.append(self._circle_on_plane(nx, [-d, 0.0, 0.0], rim_r, samples))
+    def _arrow(self, view: View, camera: Camera | None) -> Segments2:
+        r = self.radius
+        base2 = self._to_screen(self._to_camera([Vector3(0.0, 0.0, 0.0)], view.q), view, camera)[0]
+        tip2 = self._to_screen(self._to_camera([Vector3(0.0, 0.0, 1.15 * r)], view.q), view, camera)[0]
+        return self._arrow_between(base2, tip2, view)
+
+    def _arrow_between(self, base2: Vector2, tip2: Vector2, view: View) -> Segments2:
+        dv: Vector2 = tip2 - base2
+        L = dv.magnitude()
+        if L <= 1.0:
+            return []
+        u = dv / L
+        n = Vector2(-u.y, u.x)
+        head_len = 0.04 * min(view.width, view.height)
+        head_wid = 0.55 * head_len
+        pL = tip2 - u * head_len + n * head_wid
+        pR = tip2 - u * head_len - n * head_wid
+        return [[base2, tip2], [tip2, pL], [tip2, pR]]
+
+    def _project_view(self, pieces: list[tuple[list[Poly3], Vector3 | None]], view: View, samples: int) -> HeadPaths:
+        camera = self._camera(view.width, view.height)
+        front_cam, back_cam = self._split_view(pieces, view.q, camera, samples)
+        if self._record is not None:
+            t0 = perf_counter()
+        front = [self._to_screen(s, view, camera) for s in front_cam]
+        back = [self._to_screen(s, view, camera) for s in back_cam]
+        arrow = self._arrow(view, camera) if self.show_arrow else []
+        if self._record is not None:
+            n = sum(map(len, front_cam)) + sum(map(len, back_cam))
+            self._record.add("projection", t0, n, n + sum(map(len, arrow)), len(front) + len(back) + len(arrow))
+        return HeadPaths(front, back, arrow)
+
+    def build_views(self, views: Sequence[View], samples: int = 256) -> list[HeadPaths]:
+        """
+        Projects the head once per view. Head-space curves and side-band
+        clipping are shared; each view only pays for rotation, front/back
+        split and projection.
+        """
+        self._record = None if self.stats is None else self.stats.start(samples, len(views))
+        try:
+            pieces = self._head_geometry(samples)
+            return [self._project_view(pieces, view, samples) for view in views]
+        finally:
+            self._record = None
+
+    def build_paths(self, width: float, height: float, samples: int = 256) -> HeadPaths:
+        return self.build_views([View(self.q, 0.0, 0.0, width, height)], samples)[0]
+
+    def _packed_geometry(self, samples: int) -> tuple["np.ndarray", "np.ndarray", "np.ndarray", list[tuple[int, int]]]:
+        """
+        ``_head_geometry`` as flat arrays for the batched path: every vertex,
+        the normal of the side plane it lies on (zero for sphere curves), a
+        mask of plane vertices and the [start, stop) span of each polyline.
+        """
+        pieces = self._head_geometry(samples)
+        cached = self._packed_cache
+        if cached is not None and cached[0] is pieces:
+            return cached[1]
+
+        pts: list[tuple[float, float, float]] = []
+        normals: list[tuple[float, float, float]] = []
+        spans: list[tuple[int, int]] = []
+        for segments, normal in pieces:
+            nrm = (0.0, 0.0, 0.0) if normal is None else (normal.x, normal.y, normal.z)
+            for segment in segments:
+                spans.append((len(pts), len(pts) + len(segment)))
+                pts.extend((p.x, p.y, p.z) for p in segment)
+                normals.extend([nrm] * len(segment))
+        normals_arr = np.array(normals, dtype=np.float64).reshape(-1, 3)
+        packed = (
+            np.array(pts, dtype=np.float64).reshape(-1, 3),
+            normals_arr,
+            np.any(normals_arr != 0.0, axis=1),
+            spans,
+        )
+        self._packed_cache = (pieces, packed)
+        return packed
+
+    def _to_screen_batch(self, pts_cam: "np.ndarray", view: View, camera: Camera | None) -> "np.ndarray":
+        """``_to_screen`` over an (..., 3) array, returning (..., 2)."""
+        w, h = view.width, view.height
+        cx_val = view.x + w * self.center[0]
+        cy_val = view.y + h * self.center[1]
+        x, y, z = pts_cam[..., 0], pts_cam[..., 1], pts_cam[..., 2]
+        if camera is None:
+            s = self.screen_scale(w, h)
+            return np.stack([x * s + cx_val, cy_val - y * s], axis=-1)
+
+        m = camera.matrix
+        cw = np.maximum(m.m * x + m.n * y + m.o * z + m.p, EPS)
+        x_s = (m.a * x + m.b * y + m.c * z + m.d) / cw * (w * 0.5) + cx_val
+        y_s = cy_val - (m.e * x + m.f * y + m.g * z + m.h) / cw * (h * 0.5)
+        return np.stack([x_s, y_s], axis=-1)
+
+    def _emit_batched(
+        self,
+        cam: "np.ndarray",
+        values: "np.ndarray",
+        xy: "np.ndarray",
+        spans: Sequence[tuple[int, int]],
+        view: View,
+        camera: Camera | None,
+        front: Segments2,
+        back: Segments2,
+    ) -> None:
+        """
+        ``split_by_sign`` followed by ``_to_screen``, on the [start, stop)
+        polylines of rows already rotated and projected. The rows are
+        classified in one call; only the runs are cut in Python, as NumPy
+        calls per polyline would cost more than they save on short ones.
+        """
+        z, is_front, flips = sign_flips(values, EPS)
+        screen = [Vector2(x, y) for x, y in xy.tolist()]
+        self._cut_runs(cam.tolist(), z.tolist(), is_front.tolist(), screen, flips, spans, view, camera, front, back)
+
+    def _cut_runs(
+        self,
+        cam: list[list[float]] | None,
+        z: list[float],
+        is_front: list[bool],
+        screen: list[Vector2],
+        flips: list[int],
+        spans: Sequence[tuple[int, int]],
+        view: View,
+        camera: Camera | None,
+        front: Segments2,
+        back: Segments2,
+    ) -> None:
+        """
+        The Python half of ``_emit_batched``, on rows already turned into
+        lists. With ``cam`` None the projection must be affine, as the
+        orthographic one is, and crossings are interpolated on screen.
+        """
+        for start, stop in spans:
+            if stop - start < 2:
+                continue
+            opening: list[Vector2] = []  # crossing point the current run starts from
+            run_start = start
+            # flips at start or stop are between two polylines, not inside one
+            for i in flips[bisect_right(flips, start) : bisect_left(flips, stop)]:
+                zj, zi = z[i - 1], z[i]
+                denom = zj - zi
+                if abs(denom) < EPS:
+                    pc = screen[i - 1]
+                else:
+                    t = min(max(zj / denom, 0.0), 1.0)
+                    if cam is None:
+                        a, b = screen[i - 1], screen[i]
+                        pc = Vector2(a.x + (b.x - a.x) * t, a.y + (b.y - a.y) * t)
+                    else:
+                        (xa, ya, za), (xb, yb, zb) = cam[i - 1], cam[i]
+                        pc = self._to_screen([Vector3(xa + (xb - xa) * t, ya + (yb - ya) * t, za + (zb - za) * t)], view, camera)[0]
+                run = opening + screen[run_start:i] + [pc]
+                (front if is_front[run_start] else back).append(run)
+                opening = [pc]
+                run_start = i
+            run = opening + screen[run_start:stop]
+            if len(run) >= 2:
+                (front if is_front[run_start] else back).append(run)
+
+    def _build_poses_batched(self, qs: "Sequence[Quaternion] | np.ndarray", width: float, height: float, samples: int) -> list[HeadPaths]:
+        quats = quaternion_array(qs)
+        rot = rotation_matrices(quats)
+        pts, normals, on_plane, spans = self._packed_geometry(samples)
+        camera = self._camera(width, height)
+        frame = View(q_identity(), 0.0, 0.0, width, height)
+
+        # (N poses, M vertices, 3) in one go: rotation, facing and projection
+        cam = rotate(rot, pts)
+        normals_cam = rotate(rot, normals)
+        xy = self._to_screen_batch(cam, frame, camera)
+        if camera is None:
+            nz = normals_cam[..., 2]
+            values = np.where(on_plane & (np.abs(nz) > EPS), nz, cam[..., 2])
+        else:
+            sphere = cam[..., 2] * camera.eye_z - np.einsum("nmi,nmi->nm", cam, cam)
+            plane = normals_cam[..., 2] * camera.eye_z - np.einsum("nmi,nmi->nm", normals_cam, cam)
+            values = np.where(on_plane, plane, sphere)
+
+        silhouettes = self._silhouettes_batch(rot, camera, samples) if self.show_silhouette else None
+
+        out: list[HeadPaths] = []
+        for k, (w, x, y, z) in enumerate(quats.tolist()):
+            view = frame._replace(q=Quaternion(w, x, y, z))
+            silhouette = None if silhouettes is None else silhouettes[k]
+            out.append(self._emit_pose(rot[k], cam[k], values[k], xy[k], silhouette, spans, view, camera))
+        return out
 
-        crosses_plus: list[Poly3] = []
-        crosses_minus: list[Poly3] = []
+    def _emit_pose(
+        self,
+        rot: "np.ndarray",
+        cam: "np.ndarray",
+        values: "np.ndarray",
+        xy: "np.ndarray",
+        silhouette: "np.ndarray | None",
+        spans: list[tuple[int, int]],
+        view: View,
+        camera: Camera | None,
+    ) -> HeadPaths:
+        """
+        The paths of one pose of a batch: ``cam``, ``values`` and ``xy`` are
+        its rows of the rotated, classified and projected packed geometry,
+        ``silhouette`` its head-space silhouette circle.
+        """
+        front: Segments2 = []
+        back: Segments2 = []
+        if silhouette is not None:
+            d, _ = self._side_cut()
+            for segment in geom_batch.clip_to_side_band(silhouette, d, EPS):
+                seg_cam = segment @ rot.T
+                if camera is None:
+                    seg_values = seg_cam[:, 2]
+                else:
+                    seg_values = seg_cam[:, 2] * camera.eye_z - np.einsum("mi,mi->m", seg_cam, seg_cam)
+                seg_xy = self._to_screen_batch(seg_cam, view, camera)
+                self._emit_batched(seg_cam, seg_values, seg_xy, [(0, len(seg_cam))], view, camera, front, back)
+        self._emit_batched(cam, values, xy, spans, view, camera, front, back)
+        arrow = self._arrow(view, camera) if self.show_arrow else []
+        return HeadPaths(front, back, arrow)
+
+    def build_heads(self, heads: Sequence["LoomisHead3D"], width: float, height: float, samples: int = 256) -> list[HeadPaths]:
+        """
+        One ``HeadPaths`` per head of ``heads``, which must share this head's
+        ``geometry_key`` and may differ in orientation, center and scale, as
+        the heads of a crowd do. Needs NumPy. In the orthographic view the
+        guides and silhouettes of all heads are rotated, classified and
+        projected as whole (N, M, 3) arrays and turned into lists once, so
+        Python only cuts the runs; perspective heads each have their own
+        camera and are classified and projected one by one. Coordinates match
+        ``build_paths`` to rounding.
+        """
+        quats = quaternion_array([head.q for head in heads])
+        rot = rotation_matrices(quats)
+        pts, normals, on_plane, spans = self._packed_geometry(samples)
+        cam = rotate(rot, pts)
+        normals_cam = rotate(rot, normals)
+        frame = View(q_identity(), 0.0, 0.0, width, height)
+        cameras = [head._camera(width, height) for head in heads]
+        if any(camera is not None for camera in cameras):
+            out: list[HeadPaths] = []
+            for k, (head, camera) in enumerate(zip(heads, cameras)):
+                view = frame._replace(q=head.q)
+                sphere = cam[k, :, 2] * camera.eye_z - np.einsum("mi,mi->m", cam[k], cam[k])
+                plane = normals_cam[k, :, 2] * camera.eye_z - np.einsum("mi,mi->m", normals_cam[k], cam[k])
+                values = np.where(on_plane, plane, sphere)
+                silhouette = self._silhouettes_batch(rot[k : k + 1], camera, samples)[0] if self.show_silhouette else None
+                xy = head._to_screen_batch(cam[k], view, camera)
+                out.append(head._emit_pose(rot[k], cam[k], values, xy, silhouette, spans, view, camera))
+            return out
+
+        # _to_screen_batch with every head's own scale and center
+        scale = np.array([head.screen_scale(width, height) for head in heads])[:, None]
+        cx = np.array([width * head.center[0] for head in heads])[:, None]
+        cy = np.array([height * head.center[1] for head in heads])[:, None]
+
+        nz = normals_cam[..., 2]
+        values = np.where(on_plane & (np.abs(nz) > EPS), nz, cam[..., 2])
+        z, is_front, flips = sign_flips(values.reshape(-1), EPS)
+        xy = np.stack([cam[..., 0] * scale + cx, cy - cam[..., 1] * scale], axis=-1)
+        z_l, front_l = z.tolist(), is_front.tolist()
+        screen = [Vector2(x, y) for x, y in xy.reshape(-1, 2).tolist()]
+        # the arrow runs from the head center to 1.15 radii along the head's +Z
+        tips = rot[:, :, 2] * (1.15 * self.radius)
+        tips_xy = np.stack([tips[:, 0:1] * scale + cx, cy - tips[:, 1:2] * scale], axis=-1)[:, 0].tolist()
 
-        if self.show_side_cross:
-            crosses_plus.extend(
-                [
-                    [Vector3(d, -rim_r, 0.0), Vector3(d, rim_r, 0.0)],
-                    [Vector3(d, 0.0, -rim_r), Vector3(d, 0.0, rim_r)],
-                ]
-            )
-            crosses_minus.extend(
-                [
-                    [Vector3(-d, -rim_r, 0.0), Vector3(-d, rim_r, 0.0)],
-                    [Vector3(-d, 0.0, -rim_r), Vector3(-d, 0.0, rim_r)],
-                ]
-            )
+        if self.show_silhouette:
+            d, _ = self._side_cut()
+            sil = self._silhouettes_batch(rot, None, samples)
+            sil_cam = np.einsum("nij,nmj->nmi", rot, sil)
+            sil_xy = np.stack([sil_cam[..., 0] * scale + cx, cy - sil_cam[..., 1] * scale], axis=-1)
+            sil_x, sil_inside = sil[..., 0].tolist(), (np.abs(sil[..., 0]) <= d).tolist()
+            sil_screen = [[Vector2(x, y) for x, y in row] for row in sil_xy.tolist()]
+
+        m = len(pts)
+        out = []
+        for k, head in enumerate(heads):
+            view = frame._replace(q=head.q)
+            front: Segments2 = []
+            back: Segments2 = []
+            if self.show_silhouette:
+                front.extend(_silhouette_runs(sil_x[k], sil_inside[k], sil_screen[k], d))
+            head_spans = [(start + k * m, stop + k * m) for start, stop in spans]
+            head._cut_runs(None, z_l, front_l, screen, flips, head_spans, view, None, front, back)
+            arrow = []
+            if self.show_arrow:
+                base = Vector2(float(cx[k, 0]), float(cy[k, 0]))
+                arrow = head._arrow_between(base, Vector2(*tips_xy[k]), view)
+            out.append(HeadPaths(front, back, arrow))
+        return out
 
-        front_paths: list[str] = []
-        back_paths: list[str] = []
-
-        for c in curves:
-            self._emit_segments(clip_to_side_band(c, d), width, height, front_paths, back_paths)
-        for rim in rims_plus:
-            self._emit_segments([rim], width, height, front_paths, back_paths, n_plus_cam)
-        for rim in rims_minus:
-            self._emit_segments([rim], width, height, front_paths, back_paths, n_minus_cam)
-        for seg in crosses_plus:
-            self._emit_segments([seg], width, height, front_paths, back_paths, n_plus_cam)
-        for seg in crosses_minus:
-            self._emit_segments([seg], width, height, front_paths, back_paths, n_minus_cam)
-
-        arrow_d = ""
-        if self.show_arrow:
-            base2 = self._to_screen(self._to_camera([Vector3(0.0, 0.0, 0.0)]), width, height)[0]
-            tip2 = self._to_screen(self._to_camera([Vector3(0.0, 0.0, 1.15 * r)]), width, height)[0]
-            dv: Vector2 = tip2 - base2
-            L = dv.magnitude()
-            if L > 1.0:
-                u = dv / L
-                n = Vector2(-u.y, u.x)
-                head_len = 0.04 * min(width, height)
-                head_wid = 0.55 * head_len
-                pL = tip2 - u * head_len + n * head_wid
-                pR = tip2 - u * head_len - n * head_wid
-                arrow_d = (
-                    f"M {base2.x:.3f},{base2.y:.3f} L {tip2.x:.3f},{tip2.y:.3f} "
-                    f"M {tip2.x:.3f},{tip2.y:.3f} L {pL.x:.3f},{pL.y:.3f} "
-                    f"M {tip2.x:.3f},{tip2.y:.3f} L {pR.x:.3f},{pR.y:.3f} "
-                )
+    def _silhouettes_batch(self, rot: "np.ndarray", camera: Camera | None, samples: int) -> "np.ndarray":
+        """Head-space silhouette circles of every pose as an (N, S, 3) array, see ``_split_silhouette``."""
+        r = self.radius
+        n_sil_head = rot[:, 2, :]  # camera +Z in head space, the last row of each rotation
+        if camera is None:
+            centers, radius = np.zeros_like(n_sil_head), r
+        else:
+            k = r / camera.eye_z
+            centers, radius = n_sil_head * (r * k), r * math.sqrt(1.0 - k * k)
+        return geom_batch.circles_on_planes(n_sil_head, centers, radius, *trig_table(samples))
+
+    def build_poses(
+        self,
+        qs: "Sequence[Quaternion] | np.ndarray",
+        width: float,
+        height: float,
+        samples: int = 256,
+    ) -> list[HeadPaths]:
+        """
+        One ``HeadPaths`` per orientation, e.g. the frames of a turnaround.
+        With NumPy, ``qs`` may also be an (N, 4) array of w, x, y, z, and the
+        guides of all poses are rotated, classified and projected as one
+        (N, M, 3) batch; coordinates then match ``build_paths`` to rounding.
+        """
+        if np is None:
+            return self.build_views([View(q_normalize(q), 0.0, 0.0, width, height) for q in qs], samples)
+        return self._build_poses_batched(qs, width, height, samples)
+
+    def svg_group(self, paths: HeadPaths, dash_back: str | None = "5,6", precision: int = 3) -> str:
+        """
+        The ``<g>`` elements of one head, without the enclosing ``<svg>``,
+        coordinates rounded to ``precision`` decimals. With ``stats`` on, the
+        formatting is charged to the latest build.
+        """
+        record = None if self.stats is None else self.stats.last()
+        if record is not None:
+            t0 = perf_counter()
+        back_d = "".join(path_str(s, precision) for s in paths.back)
+        front_d = "".join(path_str(s, precision) for s in paths.front)
+        arrow_d = "".join(path_str(s, precision) for s in paths.arrow)
 
         dash_attr = f' stroke-dasharray="{dash_back}"' if dash_back else ""
-        svg: list[str] = [
-            '<svg xmlns="http://www.w3.org/2000/svg">',
-            f'<g title="head" fill="none" stroke="{self.stroke_color}">',
-        ]
+        svg: list[str] = [f'<g title="head" fill="none" stroke="{self.stroke_color}">']
 
-        if back_paths:
-            svg.append(f'<path d="{"".join(back_paths)}" stroke-width="{self.back_line_stroke}"{dash_attr} opacity="0.6"/>')
+        if back_d:
+            svg.append(f'<path d="{back_d}" stroke-width="{self.back_line_stroke}"{dash_attr} opacity="0.6"/>')
 
-        if front_paths:
-            svg.append(f'<path d="{"".join(front_paths)}" stroke-width="{self.front_line_stroke}"/>')
+        if front_d:
+            svg.append(f'<path d="{front_d}" stroke-width="{self.front_line_stroke}"/>')
 
         if self.show_arrow and arrow_d:
             svg.append(f'</g><g fill="none" title="arrow" stroke="{self.stroke_color}">')
             svg.append(f'<path d="{arrow_d}" stroke-width="{self.front_line_stroke + 1}"/>')
 
-        svg.append("</g></svg>")
-        return "".join(svg)
+        svg.append("</g>")
+        out = "".join(svg)
+        if record is not None:
+            n = sum(len(seg) for segs in paths for seg in segs)
+            record.add("formatting", t0, n, 0, 0)
+            record.svg_bytes += len(out)
+        return out
+
+    def build_svg(self, width: float, height: float, dash_back: str | None = "5,6", samples: int = 256) -> str:
+        paths = self.build_paths(width, height, samples)
+        return wrap_svg(self.svg_group(paths, dash_back))
+
+    def build_views_svg(self, views: Sequence[View], dash_back: str | None = "5,6", samples: int = 256) -> str:
+        """Every view in one SVG document, e.g. a character sheet."""
+        return wrap_svg("".join(self.svg_group(paths, dash_back) for paths in self.build_views(views, samples)))
+
+    def build_poses_svg(
+        self,
+        qs: "Sequence[Quaternion] | np.ndarray",
+        width: float,
+        height: float,
+        dash_back: str | None = "5,6",
+        samples: int = 256,
+    ) -> list[str]:
+        """One SVG document per orientation, see ``build_poses``."""
+        return [wrap_svg(self.svg_group(paths, dash_back)) for paths in self.build_poses(qs, width, height, samples)]
@@ -1,38 +1,223 @@
 import os
+from collections import deque
+from time import perf_counter
 
 from krita import DockWidget, DockWidgetFactory, DockWidgetFactoryBase, Extension, Krita
 from PyQt5 import uic
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import QRect, QStandardPaths, Qt, QTimer
 from PyQt5.QtGui import QColor
 from PyQt5.QtWidgets import QColorDialog, QMessageBox, QVBoxLayout, QWidget
 
+from . import geom_cache
+from .alloc_profile import measure
+from .animation import OrientationTrack
+from .build_stats import Frame, FrameStats
+from .canvas_overlay import attach_overlay, document_to_widget_transform
+from .document_state import DocumentState, document_key, find_layer, remember_layer, save_tracks
+from .event_recorder import EventRecorder
+from .final_render import FinalRender
 from .linalg import q_identity
-from .loomis_head_generator import LoomisHead3D
+from .loomis_head_generator import wrap_svg
+from .quality import DEFAULT_LEVEL, LEVELS, Quality, QualityController
+from .raster_output import RasterTarget
+from .timeline import FrameRenderer
+from .tracing import TRACER
 from .trackball import TrackballWidget
 
+# Chord error allowed per crowd head, in document pixels.
+CROWD_TOLERANCE = 0.5
+
+# Set to a file path to trace the docker's interaction path; the Chrome
+# trace is written there when the head is saved.
+TRACE_PATH = os.environ.get("LOOMIS_HEAD_TRACE")
+
+# Set to a file path to record the trackball and control events of the
+# session, for replay outside Krita with benchmarks/replay_docker.py.
+RECORD_PATH = os.environ.get("LOOMIS_HEAD_RECORD")
+
+# Set to profile every redraw with tracemalloc; slows redraws down severalfold.
+ALLOC_PROFILE = bool(os.environ.get("LOOMIS_HEAD_TRACEMALLOC"))
+
+# Frame budgets offered in frameBudgetCombo, in seconds; None keeps the
+# default quality whatever a frame costs.
+FRAME_BUDGETS = (None, 1 / 60, 1 / 30, 1 / 15)
+
+# The performance HUD is repainted at most this often, not on every frame.
+HUD_REFRESH_MS = 250
+
+# Docker attributes that belong to the active document, see DocumentState.
+STATE_FIELDS = (
+    "doc",
+    "heads",
+    "crowd",
+    "loomis_head",
+    "loomis_layer",
+    "head_layers",
+    "committed_keys",
+    "raster_target",
+    "tracks",
+    "animation_layer",
+)
+
 
 class LoomisProportionsDocker(DockWidget):
     def __init__(self):
         super().__init__()
 
-        self.doc = Krita.instance().activeDocument()
-        self.loomis_head = LoomisHead3D()
-        self.loomis_layer = None
+        geom_cache.install(self.resource_dir())
+        self.documents: dict[str, DocumentState] = {}  # by document_key
+        self.load_state(DocumentState(Krita.instance().activeDocument()))
+        if self.doc:
+            self.documents[document_key(self.doc)] = self.state
         self.update_scheduled = False
+        self.update_queued_at = 0
+        self.interacting = False
+        self.overlay = None
+        self.scratch_target = None
+        self.frame_renderer = None
+        self.frame_stats = FrameStats()
+        self.frame_build = (0.0, 0.0, 0)  # seconds, end time and cache hits of the last build
+        self.hud_refresh_pending = False
+        self.alloc_profiles = deque(maxlen=120)  # AllocProfile of recent redraws, with ALLOC_PROFILE
+        self.recorder = None
+        self.quality = QualityController()
+        self.final_render = None
+
+        if TRACE_PATH:
+            TRACER.start()
 
         self.setWindowTitle("Loomis Head Controls")
         self.setMinimumSize(400, 500)
         self.connect_ui()
+        if RECORD_PATH and self.doc:
+            self.recorder = EventRecorder(RECORD_PATH, self.doc.width(), self.doc.height())
+            self.recorder.attach(self)
         self.activateWindow()
         self.create_loomis_layer()
 
     def canvasChanged(self, canvas):
-        pass
+        """
+        Follows the active document. A document drawn into before gets its
+        heads back with the layers as they were, so the switch shows the
+        cached render without building anything.
+        """
+        doc = Krita.instance().activeDocument()
+        if doc is None or self.doc is None or self.final_render is not None:
+            return
+        key = document_key(doc)
+        if key == self.state.key:
+            return
+
+        self.drop_scratch()
+        self.store_state()
+        open_keys = {document_key(d) for d in Krita.instance().documents()}
+        for stale in [k for k in self.documents if k not in open_keys]:
+            del self.documents[stale]
+        state = self.documents.get(key)
+        fresh = state is None
+        if fresh:
+            state = self.documents[key] = DocumentState(doc)
+        self.load_state(state)
+        self.sync_options()
+        if fresh or not self.layers_alive():
+            self.create_loomis_layer()
+
+    def store_state(self):
+        for name in STATE_FIELDS:
+            setattr(self.state, name, getattr(self, name))
+        self.state.raster_output = self.ui.rasterOutput.isChecked()
+        self.state.layer_per_head = self.ui.layerPerHead.isChecked()
+        self.state.crowd_enabled = self.ui.groupCrowd.isChecked()
+
+    def load_state(self, state: DocumentState):
+        self.state = state
+        for name in STATE_FIELDS:
+            setattr(self, name, getattr(state, name))
+
+    def sync_options(self):
+        """Shows the output and crowd options of the loaded document, and its current head."""
+        options = (
+            (self.ui.rasterOutput, self.state.raster_output),
+            (self.ui.layerPerHead, self.state.layer_per_head),
+            (self.ui.groupCrowd, self.state.crowd_enabled),
+        )
+        for box, checked in options:
+            box.blockSignals(True)
+            box.setChecked(checked)
+            box.blockSignals(False)
+        self.ui.rasterOutput.setEnabled(RasterTarget.supported(self.doc))
+        self.enable_placement(not self.state.crowd_enabled)
+
+        crowd = self.crowd
+        values = (
+            (self.ui.horizonSlider, round(crowd.horizon * 100)),
+            (self.ui.vanishingSlider, round(crowd.vanishing_x * 100)),
+            (self.ui.eyeHeightSlider, round(crowd.eye_height * 100)),
+            (self.ui.crowdRows, crowd.rows),
+            (self.ui.crowdColumns, crowd.columns),
+        )
+        for widget, value in values:
+            widget.blockSignals(True)
+            widget.setValue(value)
+            widget.blockSignals(False)
+        self.refresh_head_combo()
+        self.sync_controls()
+
+    @staticmethod
+    def resource_dir() -> str:
+        app = Krita.instance()
+        if hasattr(app, "getAppDataLocation"):
+            return app.getAppDataLocation()
+        return QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
 
     def with_schedule_update(self, fn):
         fn()
+        if self.crowd_enabled():
+            removed = self.crowd.apply(self.heads, self.doc.width(), self.doc.height())
+            for head in removed:
+                self.tracks.pop(head, None)
+            if removed:
+                self.save_tracks()
+        self.trackball.set_preview_style(self.loomis_head)
         self.schedule_update()
 
+    def orientation_changed(self, q):
+        with TRACER.span("orientation_changed"):
+            self.with_schedule_update(lambda: self.set_orientation(q))
+
+    def set_orientation(self, q):
+        if self.crowd_enabled():
+            self.crowd.set_orientation(q)
+        else:
+            self.loomis_head.set_quaternion(q)
+
+    def crowd_enabled(self) -> bool:
+        return bool(self.doc) and self.ui.groupCrowd.isChecked()
+
+    def toggle_crowd(self, enabled: bool):
+        if enabled:
+            self.loomis_head = self.heads[0]
+            self.crowd.set_orientation(self.loomis_head.q)
+        self.enable_placement(not enabled)
+        self.with_schedule_update(self.refresh_head_combo)
+
+    def enable_placement(self, enabled: bool):
+        """The crowd places its heads itself, so the per-head placement controls are off while it is on."""
+        placement = (
+            self.ui.headCombo,
+            self.ui.addHeadButton,
+            self.ui.removeHeadButton,
+            self.ui.sizeSlider,
+            self.ui.posXSlider,
+            self.ui.posYSlider,
+        )
+        for widget in placement:
+            widget.setEnabled(enabled)
+
+    def tolerance(self):
+        """Per-head LOD tolerance in pixels; only crowds have heads small enough to need it."""
+        return CROWD_TOLERANCE if self.crowd_enabled() else None
+
     def pick_stroke_color(self):
         old_hex = self.loomis_head.stroke_color
         old_qcolor = QColor(old_hex)
@@ -47,6 +232,7 @@ class LoomisProportionsDocker(DockWidget):
             hex_rgb = col.name(QColor.HexRgb)
             self.loomis_head.set_stroke_color(hex_rgb)
             self.ui.strokeColorSwatch.setStyleSheet(f"background-color: {hex_rgb}; border: 1px solid #666;")
+            self.trackball.set_preview_style(self.loomis_head)
             self.schedule_update()
 
         dlg.currentColorChanged.connect(apply_color)
@@ -55,6 +241,7 @@ class LoomisProportionsDocker(DockWidget):
         def revert():
             self.loomis_head.set_stroke_color(old_hex)
             self.ui.strokeColorSwatch.setStyleSheet(f"background-color: {old_hex}; border: 1px solid #666;")
+            self.trackball.set_preview_style(self.loomis_head)
             self.schedule_update()
 
         dlg.rejected.connect(revert)
@@ -70,8 +257,11 @@ class LoomisProportionsDocker(DockWidget):
         lay = QVBoxLayout(host)
         lay.setContentsMargins(0, 0, 0, 0)
         lay.addWidget(self.trackball)
+        self.trackball.set_preview_style(self.loomis_head)
 
-        self.trackball.orientation_changed.connect(lambda v: self.with_schedule_update(lambda: self.loomis_head.set_quaternion(v)))
+        self.trackball.orientation_changed.connect(self.orientation_changed)
+        self.trackball.interaction_started.connect(self.begin_interaction)
+        self.trackball.interaction_finished.connect(self.end_interaction)
 
         self.ui.sizeSlider.valueChanged.connect(lambda v: self.with_schedule_update(lambda: self.loomis_head.set_scale(v * 0.01)))
         self.ui.sideCutSlider.valueChanged.connect(lambda v: self.with_schedule_update(lambda: self.loomis_head.set_sidecut(v * 0.01)))
@@ -79,49 +269,509 @@ class LoomisProportionsDocker(DockWidget):
             lambda v: self.with_schedule_update(lambda: self.loomis_head.set_front_line_stroke(v))
         )
         self.ui.backStrokeSlider.valueChanged.connect(lambda v: self.with_schedule_update(lambda: self.loomis_head.set_back_line_stroke(v)))
+        self.ui.posXSlider.valueChanged.connect(
+            lambda v: self.with_schedule_update(lambda: self.loomis_head.set_center(v * 0.01, self.loomis_head.center[1]))
+        )
+        self.ui.posYSlider.valueChanged.connect(
+            lambda v: self.with_schedule_update(lambda: self.loomis_head.set_center(self.loomis_head.center[0], v * 0.01))
+        )
+
+        self.ui.perspectiveCheck.toggled.connect(self.ui.focalSlider.setEnabled)
+        self.ui.perspectiveCheck.toggled.connect(lambda v: self.with_schedule_update(lambda: self.loomis_head.set_perspective(v)))
+        self.ui.focalSlider.valueChanged.connect(lambda v: self.with_schedule_update(lambda: self.loomis_head.set_focal_length(v)))
+
+        for slider in self.sliders() + (self.ui.horizonSlider, self.ui.vanishingSlider, self.ui.eyeHeightSlider):
+            slider.sliderPressed.connect(self.begin_interaction)
+            slider.sliderReleased.connect(self.end_interaction)
 
         self.ui.showArrow.toggled.connect(lambda v: self.with_schedule_update(lambda: self.loomis_head.set_arrow(v)))
         self.ui.showSilhouette.toggled.connect(lambda v: self.with_schedule_update(lambda: self.loomis_head.set_silhouette(v)))
         self.ui.showSideRims.toggled.connect(lambda v: self.with_schedule_update(lambda: self.loomis_head.set_side_rims(v)))
         self.ui.showSideCross.toggled.connect(lambda v: self.with_schedule_update(lambda: self.loomis_head.set_side_cross(v)))
+        self.ui.rasterOutput.setEnabled(bool(self.doc) and RasterTarget.supported(self.doc))
+        self.ui.rasterOutput.toggled.connect(lambda v: self.create_loomis_layer())
+        self.ui.layerPerHead.toggled.connect(lambda v: self.create_loomis_layer())
+        self.ui.groupCrowd.toggled.connect(self.toggle_crowd)
+        self.ui.groupPerformance.toggled.connect(self.toggle_hud)
+        self.quality.set_budget(FRAME_BUDGETS[self.ui.frameBudgetCombo.currentIndex()])
+        self.ui.frameBudgetCombo.currentIndexChanged.connect(lambda i: self.quality.set_budget(FRAME_BUDGETS[i]))
+        self.ui.horizonSlider.valueChanged.connect(lambda v: self.with_schedule_update(lambda: self.crowd.set_horizon(v * 0.01)))
+        self.ui.vanishingSlider.valueChanged.connect(lambda v: self.with_schedule_update(lambda: self.crowd.set_vanishing_x(v * 0.01)))
+        self.ui.eyeHeightSlider.valueChanged.connect(lambda v: self.with_schedule_update(lambda: self.crowd.set_eye_height(v * 0.01)))
+        self.ui.crowdRows.valueChanged.connect(
+            lambda v: self.with_schedule_update(lambda: self.crowd.set_grid(v, self.ui.crowdColumns.value()))
+        )
+        self.ui.crowdColumns.valueChanged.connect(
+            lambda v: self.with_schedule_update(lambda: self.crowd.set_grid(self.ui.crowdRows.value(), v))
+        )
+        self.ui.headCombo.currentIndexChanged.connect(self.select_head)
+        self.ui.addHeadButton.clicked.connect(self.add_head)
+        self.ui.removeHeadButton.clicked.connect(self.remove_head)
+        self.refresh_head_combo()
+        self.refresh_key_info()
+        self.ui.setKeyButton.clicked.connect(self.set_key)
+        self.ui.removeKeyButton.clicked.connect(self.remove_key)
+        self.ui.renderFramesButton.clicked.connect(self.render_frames)
+        self.ui.cancelFramesButton.clicked.connect(self.cancel_frames)
         self.ui.strokeColorButton.clicked.connect(self.pick_stroke_color)
         self.ui.resetButton.clicked.connect(self.reset_view)
         self.ui.saveButton.clicked.connect(self.save_head)
+        self.ui.cancelSaveButton.clicked.connect(self.cancel_save)
+
+    def sliders(self):
+        return (
+            self.ui.sizeSlider,
+            self.ui.sideCutSlider,
+            self.ui.frontStrokeSlider,
+            self.ui.backStrokeSlider,
+            self.ui.posXSlider,
+            self.ui.posYSlider,
+            self.ui.focalSlider,
+        )
+
+    def refresh_head_combo(self):
+        combo = self.ui.headCombo
+        combo.blockSignals(True)
+        combo.clear()
+        combo.addItems([f"Head {i + 1}" for i in range(len(self.heads))])
+        combo.setCurrentIndex(self.heads.heads.index(self.loomis_head))
+        combo.blockSignals(False)
+        self.ui.removeHeadButton.setEnabled(len(self.heads) > 1)
+
+    def select_head(self, index: int):
+        if not 0 <= index < len(self.heads):
+            return
+        self.loomis_head = self.heads[index]
+        self.sync_controls()
+
+    def sync_controls(self):
+        """Shows the settings of the current head without emitting change signals."""
+        head = self.loomis_head
+        values = (
+            (self.ui.sizeSlider, round(head.scale * 100)),
+            (self.ui.sideCutSlider, round(head.side_cut * 100)),
+            (self.ui.frontStrokeSlider, round(head.front_line_stroke)),
+            (self.ui.backStrokeSlider, round(head.back_line_stroke)),
+            (self.ui.posXSlider, round(head.center[0] * 100)),
+            (self.ui.posYSlider, round(head.center[1] * 100)),
+            (self.ui.focalSlider, round(head.focal_length)),
+        )
+        for slider, value in values:
+            slider.blockSignals(True)
+            slider.setValue(value)
+            slider.blockSignals(False)
+
+        toggles = (
+            (self.ui.showArrow, head.show_arrow),
+            (self.ui.showSilhouette, head.show_silhouette),
+            (self.ui.showSideRims, head.show_side_rims),
+            (self.ui.showSideCross, head.show_side_cross),
+            (self.ui.perspectiveCheck, head.perspective),
+        )
+        for box, checked in toggles:
+            box.blockSignals(True)
+            box.setChecked(checked)
+            box.blockSignals(False)
+
+        self.ui.focalSlider.setEnabled(head.perspective)
+        self.ui.strokeColorSwatch.setStyleSheet(f"background-color: {head.stroke_color}; border: 1px solid #666;")
+        self.trackball.set_orientation(head.q)
+        self.trackball.set_preview_style(head)
+        self.refresh_key_info()
+
+    def add_head(self):
+        self.loomis_head = self.heads.add(self.loomis_head)
+        self.refresh_head_combo()
+        self.sync_controls()
+        self.schedule_update()
+
+    def remove_head(self):
+        if len(self.heads) < 2:
+            return
+        index = self.heads.heads.index(self.loomis_head)
+        self.heads.remove(self.loomis_head)
+        self.tracks.pop(self.loomis_head, None)
+        self.save_tracks()
+        self.loomis_head = self.heads[min(index, len(self.heads) - 1)]
+        self.refresh_head_combo()
+        self.sync_controls()
+        self.schedule_update()
+
+    def track(self, head) -> OrientationTrack:
+        return self.tracks.setdefault(head, OrientationTrack())
+
+    def save_tracks(self):
+        """Keys are saved with the document, by head index; see ``document_state.load_tracks``."""
+        if self.doc:
+            save_tracks(self.doc, self.heads, self.tracks)
+
+    def refresh_key_info(self):
+        track = self.track(self.loomis_head)
+        self.ui.keyInfo.setText(f"{len(track)} keys" if len(track) else "No keys")
+        self.ui.removeKeyButton.setEnabled(len(track) > 0)
+
+    def set_key(self):
+        if self.doc:
+            self.track(self.loomis_head).set_key(self.doc.currentTime(), self.loomis_head.q)
+            self.save_tracks()
+            self.refresh_key_info()
+
+    def remove_key(self):
+        if self.doc:
+            self.track(self.loomis_head).remove_key(self.doc.currentTime())
+            self.save_tracks()
+            self.refresh_key_info()
+
+    def render_frames(self):
+        if not self.doc or self.frame_renderer is not None:
+            return
+        heads = [(head, self.track(head)) for head in self.heads]
+        self.frame_renderer = FrameRenderer(self.doc, heads, "8,8", 256, self)
+        self.frame_renderer.progress.connect(self.frames_progress)
+        self.frame_renderer.finished.connect(self.frames_finished)
+        self.ui.renderFramesButton.setEnabled(False)
+        self.ui.framesProgress.setValue(0)
+        self.ui.framesProgress.show()
+        self.ui.cancelFramesButton.show()
+        self.frame_renderer.start()
+
+    def frames_progress(self, done: int, total: int):
+        self.ui.framesProgress.setMaximum(total)
+        self.ui.framesProgress.setValue(done)
+
+    def frames_finished(self, layer):
+        self.frame_renderer = None
+        if layer is not None:
+            # the import makes a new layer each time; it replaces the previous render
+            if self.animation_layer is not None:
+                self.doc.rootNode().removeChildNode(self.animation_layer)
+            layer.setName("Loomis Head Animation")
+            self.animation_layer = layer
+        self.ui.renderFramesButton.setEnabled(True)
+        self.ui.framesProgress.hide()
+        self.ui.cancelFramesButton.hide()
+
+    def cancel_frames(self):
+        if self.frame_renderer is not None:
+            self.frame_renderer.cancel()
+
+    def layer_name(self, head) -> str:
+        index = self.heads.heads.index(head)
+        return "Loomis Head" if index == 0 else f"Loomis Head {index + 1}"
+
+    def add_layer(self, node):
+        self.doc.rootNode().addChildNode(node, None)
+        return node
 
     def schedule_update(self):
         if self.update_scheduled:
             return
 
         self.update_scheduled = True
-        QTimer.singleShot(0, self.draw_lines_with_vectors)
+        self.update_queued_at = TRACER.now()
+        QTimer.singleShot(0, self.redraw)
+
+    def begin_interaction(self):
+        self.interacting = True
+        self.overlay = attach_overlay(Krita.instance().activeWindow(), self.overlay)
+
+    def end_interaction(self):
+        self.interacting = False
+        if self.overlay is not None:
+            self.overlay.hide()
+        self.hide_scratch()
+        self.set_layers_visible(True)
+        self.schedule_update()
 
-    def create_loomis_layer(self):
-        if self.loomis_layer:
-            self.doc.rootNode().removeChildNode(self.loomis_layer)
+    def redraw(self):
+        TRACER.wait("queued redraw", self.update_queued_at, TRACER.now())
+        with TRACER.span("redraw"):
+            start = perf_counter()
+            if ALLOC_PROFILE:
+                self.alloc_profiles.append(measure(self.draw)[1])
+            else:
+                self.draw()
+            if self.interacting:
+                self.quality.observe(perf_counter() - start)
+
+    def draw(self):
+        """
+        Interactive frames take the controller's quality; the frame after an
+        interaction gets full detail. Shape edits are recorded as undo
+        commands by Krita, so interactive frames never touch the vector
+        layers. A gesture is written to them once, on release, through
+        ``replace_shapes``, so it leaves one step in the undo history.
+        """
+        if not self.interacting:
+            self.commit(self.quality.rest_quality())
+            return
+        quality = self.quality.quality()
+        if self.draw_preview(quality):
+            return
+        if self.raster_target is not None:
+            self.draw_raster(quality)
+        elif not self.draw_scratch(quality):
+            # nothing to preview on: the trackball's wireframe has to do until release
+            self.update_scheduled = False
+
+    def build_heads(self, quality: Quality, svg: bool = False):
+        """Builds at ``quality``; only frames written to vector layers need ``svg``."""
+        hits = self.heads.hits
+        start = perf_counter()
+        with TRACER.span("HeadCollection.build", args={"samples": quality.samples, "heads": len(self.heads)}):
+            built = self.heads.build(
+                self.doc.width(),
+                self.doc.height(),
+                "8,8",
+                quality.samples,
+                self.tolerance(),
+                quality.precision,
+                quality.back_lines,
+                svg,
+            )
+        end = perf_counter()
+        self.frame_build = (end - start, end, self.heads.hits - hits)
+        return built
+
+    def record_frame(self, built, samples: int, svg_bytes: int = 0):
+        """Adds the frame just applied to the performance HUD; a no-op while the HUD is off."""
+        if not self.ui.groupPerformance.isChecked():
+            return
+        now = perf_counter()
+        build, built_at, hits = self.frame_build
+        vertices = sum(len(seg) for b in built for segs in b.paths for seg in segs)
+        self.frame_stats.add(Frame(now, build, now - built_at, svg_bytes, vertices, len(built), hits, samples))
+        if not self.hud_refresh_pending:
+            self.hud_refresh_pending = True
+            QTimer.singleShot(HUD_REFRESH_MS, self.refresh_hud)
+
+    def toggle_hud(self, enabled: bool):
+        self.frame_stats.clear()
+        self.ui.perfStats.setText("No frames yet")
+        self.ui.perfStats.setVisible(enabled)
+
+    def refresh_hud(self):
+        self.hud_refresh_pending = False
+        s = self.frame_stats.summary()
+        if not s or not self.ui.groupPerformance.isChecked():
+            return
+        lod = f"{s['samples']} samples, level {self.quality.level + 1} of {len(LEVELS)}"
+        if self.tolerance() is not None:
+            lod += f", {self.tolerance()} px per crowd head"
+        self.ui.perfStats.setText(
+            "\n".join(
+                (
+                    f"Frame rate: {s['fps']:.0f} fps",
+                    f"Build: {s['build_median'] * 1e3:.1f} ms median, {s['build_p95'] * 1e3:.1f} ms p95",
+                    f"Krita apply: {s['apply_median'] * 1e3:.1f} ms median",
+                    f"SVG: {s['svg_bytes'] / 1024:.1f} KiB per frame",
+                    f"Vertices: {s['vertices']}",
+                    f"Cache hits: {s['cache_hit_rate']:.0%}",
+                    f"LOD: {lod}",
+                )
+            )
+            + self.alloc_text()
+        )
+
+    def alloc_text(self) -> str:
+        if not self.alloc_profiles:
+            return ""
+        last = self.alloc_profiles[-1]
+        modules = ", ".join(f"{name} {blocks}" for name, (blocks, _) in last.modules.items())
+        return f"\nAllocations: {last.blocks} blocks held, {last.peak / 1024:.0f} KiB peak\n  ({modules})"
+
+    def commit(self, quality: Quality = LEVELS[DEFAULT_LEVEL]):
+        if self.raster_target is not None:
+            self.draw_raster(quality)
+        else:
+            self.draw_lines_with_vectors(quality)
+
+    def draw_preview(self, quality: Quality = LEVELS[DEFAULT_LEVEL]) -> bool:
+        """
+        Paints the guides on the canvas overlay instead of the vector layer.
+        Returns False when no overlay can be used, so the caller falls back to
+        the vector layer.
+        """
+        window = Krita.instance().activeWindow()
+        view = window.activeView() if window else None
+        transform = document_to_widget_transform(view) if view else None
+        if self.overlay is None or transform is None or not self.doc:
+            return False
+
+        built = self.build_heads(quality)
+        with TRACER.span("CanvasOverlay.set_paths"):
+            self.overlay.set_paths([(b.head, b.paths) for b in built], transform, "8,8")
+        self.overlay.show()
+        self.set_layers_visible(False)
+        self.record_frame(built, quality.samples)
+        self.update_scheduled = False
+        return True
+
+    def draw_scratch(self, quality: Quality = LEVELS[DEFAULT_LEVEL]) -> bool:
+        """
+        Paints an interactive frame into a preview paint layer, for when
+        there is no canvas overlay. Pixel writes keep no undo data, unlike
+        shape edits. The layer is hidden between gestures and shown again
+        by the next one, rather than made anew each time. Returns False when
+        the document has no raster path.
+        """
+        if not self.doc or not RasterTarget.supported(self.doc):
+            return False
+        target = self.scratch_target
+        if target is not None and not target.node.visible():
+            present = {node.uniqueId().toString() for node in self.doc.rootNode().childNodes()}
+            if target.node.uniqueId().toString() in present:
+                target.node.setVisible(True)
+            else:  # deleted by the user since the last gesture
+                self.scratch_target = None
+        if self.scratch_target is None:
+            node = self.add_layer(self.doc.createNode("Loomis Head Preview", "paintlayer"))
+            self.scratch_target = RasterTarget(self.doc, node, antialias=False)
+
+        built = self.build_heads(quality)
+        with TRACER.span("RasterTarget.render"):
+            self.scratch_target.render([(b.head, b.paths) for b in built], "8,8")
+        self.set_layers_visible(False)
+        self.record_frame(built, quality.samples)
+        self.update_scheduled = False
+        return True
+
+    def hide_scratch(self):
+        """Clears what the gesture painted on the preview layer and hides it until the next one."""
+        if self.scratch_target is not None and self.scratch_target.node.visible():
+            self.scratch_target.render([], "8,8")
+            self.scratch_target.node.setVisible(False)
 
-        self.loomis_layer = self.doc.createVectorLayer("Loomis Head")
-        self.doc.rootNode().addChildNode(self.loomis_layer, None)
+    def drop_scratch(self):
+        if self.scratch_target is not None:
+            if self.doc:
+                self.doc.rootNode().removeChildNode(self.scratch_target.node)
+            self.scratch_target = None
 
+    def output_layers(self):
+        if self.loomis_layer:
+            return [self.loomis_layer]
+        return list(self.head_layers.values())
+
+    def set_layers_visible(self, visible: bool):
+        changed = False
+        for layer in self.output_layers():
+            if layer.visible() != visible:
+                layer.setVisible(visible)
+                changed = True
+        if changed:
+            self.doc.refreshProjection()
+
+    def create_loomis_layer(self):
+        """Sets up the layers of the chosen output, taking over those an earlier session left in the document."""
+        for layer in self.output_layers():
+            self.doc.rootNode().removeChildNode(layer)
+        self.loomis_layer = None
+        self.head_layers = {}
+        self.raster_target = None
+
+        if self.ui.rasterOutput.isChecked():
+            self.loomis_layer = self.reuse_layer("Loomis Head", "paintlayer")
+            self.raster_target = RasterTarget(self.doc, self.loomis_layer)
+            # a reused layer may hold guides anywhere, clear all of it on the first frame
+            self.raster_target.dirty = QRect(0, 0, self.doc.width(), self.doc.height())
+        elif self.ui.layerPerHead.isChecked():
+            self.sync_head_layers()
+        else:
+            self.loomis_layer = self.reuse_layer("Loomis Head", "vectorlayer")
+
+        self.committed_keys = {}
         self.schedule_update()
 
-    def draw_lines_with_vectors(self, samples: int = 256):
-        if not self.doc or not self.loomis_layer:
+    def sync_head_layers(self):
+        """Gives every head its own layer and drops the layers of removed heads."""
+        alive = set(self.heads)
+        for key in [k for k in self.head_layers if k not in alive]:
+            self.doc.rootNode().removeChildNode(self.head_layers.pop(key))
+            self.committed_keys.pop(key, None)
+        for head in self.heads:
+            if head not in self.head_layers:
+                taken = {layer.uniqueId().toString() for layer in self.head_layers.values()}
+                self.head_layers[head] = self.reuse_layer(self.layer_name(head), "vectorlayer", taken)
+
+    def reuse_layer(self, name: str, node_type: str, taken: set[str] = frozenset()):
+        """The document's layer called ``name``, found or added, and recorded for the next session."""
+        node = find_layer(self.doc, name, node_type, taken)
+        if node is None:
+            node = self.doc.createVectorLayer(name) if node_type == "vectorlayer" else self.doc.createNode(name, node_type)
+            self.add_layer(node)
+        remember_layer(self.doc, name, node)
+        return node
+
+    def layers_alive(self) -> bool:
+        """False once the user deleted one of the output layers of this document."""
+        present = {node.uniqueId().toString() for node in self.doc.rootNode().childNodes()}
+        layers = self.output_layers()
+        return bool(layers) and all(layer.uniqueId().toString() in present for layer in layers)
+
+    @staticmethod
+    def replace_shapes(layer, body: str) -> int:
+        """
+        Swaps the layer's shapes for ``body`` wrapped in a single group;
+        returns the bytes handed to Krita. Every shape removal is an undo
+        command of its own, so the layer holds only that one group shape and
+        a commit replaces it rather than each stroke.
+        """
+        svg = wrap_svg(f"<g>{body}</g>")
+        with TRACER.span("remove shapes", "krita"):
+            for shape in layer.shapes():
+                shape.remove()
+        with TRACER.span("addShapesFromSvg", "krita", {"bytes": len(svg)}):
+            layer.addShapesFromSvg(svg)
+        return len(svg)
+
+    def uncommitted(self, built) -> list:
+        """Heads whose current geometry has not been written to the document yet."""
+        return [b for b in built if self.committed_keys.get(b.head) != b.key]
+
+    def draw_lines_with_vectors(self, quality: Quality = LEVELS[DEFAULT_LEVEL]):
+        if not self.doc or not (self.loomis_layer or self.ui.layerPerHead.isChecked()):
             self.update_scheduled = False
             return
 
-        svg = self.loomis_head.build_svg(
-            width=self.doc.width(),
-            height=self.doc.height(),
-            dash_back="8,8",
-            samples=samples,
-        )
+        built = self.build_heads(quality, svg=True)
+        svg_bytes = self.write_vectors(built)
+        self.record_frame(built, quality.samples, svg_bytes)
+        self.update_scheduled = False
 
-        for shape in self.loomis_layer.shapes():
-            shape.remove()
+    def write_vectors(self, built) -> int:
+        """Replaces the shapes of changed heads; returns the SVG bytes handed to Krita."""
+        changed = self.uncommitted(built)
+        svg_bytes = 0
+        if self.loomis_layer:
+            if changed or len(built) != len(self.committed_keys):
+                svg_bytes = self.replace_shapes(self.loomis_layer, "".join(b.svg_group for b in built))
+        else:
+            self.sync_head_layers()
+            for b in changed:
+                layer = self.head_layers.get(b.head)
+                if layer is not None:
+                    svg_bytes += self.replace_shapes(layer, b.svg_group)
+
+        self.committed_keys = {b.head: b.key for b in built}
+        return svg_bytes
+
+    def draw_raster(self, quality: Quality = LEVELS[DEFAULT_LEVEL]):
+        if not self.doc or self.raster_target is None:
+            self.update_scheduled = False
+            return
 
-        self.loomis_layer.addShapesFromSvg(svg)
+        built = self.build_heads(quality)
+        self.write_raster(built)
+        self.record_frame(built, quality.samples)
         self.update_scheduled = False
 
+    def write_raster(self, built):
+        if self.uncommitted(built) or len(built) != len(self.committed_keys):
+            with TRACER.span("RasterTarget.render"):
+                self.raster_target.render([(b.head, b.paths) for b in built], "8,8")
+        self.committed_keys = {b.head: b.key for b in built}
+
     def reset_view(self):
         self.loomis_head.scale = 1.0
         self.trackball.reset(emit=False)
@@ -131,16 +781,74 @@ class LoomisProportionsDocker(DockWidget):
 
     def save_head(self):
         """
-        Redrawing the head with higher accuracy.
-        Can't test it on low end devices, so I may need to tone it down. 
+        Writes the guides at final detail and closes the docker. The final
+        pass is built in the background with a progress bar and can be
+        cancelled; the docker is only torn down once the result is in the
+        document.
         """
+        if self.final_render is not None:
+            return
+        self.cancel_frames()
+        if not self.doc:
+            self.close_docker()
+            return
 
-        samples = 256; """Default samples"""
-        samples *= 4; """Higher rendering pass"""
-
-        self.draw_lines_with_vectors(samples)
-        self.doc = None
-        self.loomis_layer = None
+        self.final_render = FinalRender(list(self.heads), self.doc.width(), self.doc.height(), "8,8", self)
+        self.final_render.progress.connect(self.save_progress)
+        self.final_render.finished.connect(self.save_finished)
+        self.final_render.failed.connect(self.save_failed)
+        self.set_saving(True)
+        self.final_render.start()
+
+    def set_saving(self, saving: bool):
+        """Locks the controls while the final pass runs, so nothing edits what is being saved."""
+        for widget in self.ui.findChildren(QWidget, options=Qt.FindDirectChildrenOnly):
+            if widget not in (self.ui.saveProgress, self.ui.cancelSaveButton):
+                widget.setEnabled(not saving)
+        self.ui.saveProgress.setValue(0)
+        self.ui.saveProgress.setVisible(saving)
+        self.ui.cancelSaveButton.setVisible(saving)
+
+    def save_progress(self, done: int, total: int):
+        # a single head has no steps to show, so the bar just stays busy
+        self.ui.saveProgress.setMaximum(total if total > 1 else 0)
+        self.ui.saveProgress.setValue(done)
+
+    def save_finished(self, built):
+        self.final_render = None
+        if built is None:
+            self.set_saving(False)
+            return
+        if self.raster_target is not None:
+            self.write_raster(built)
+        elif self.loomis_layer or self.ui.layerPerHead.isChecked():
+            self.write_vectors(built)
+        self.close_docker()
+
+    def save_failed(self, message: str):
+        """Keeps the docker open with nothing written, so the user can retry or keep editing."""
+        self.final_render = None
+        self.set_saving(False)
+        error_box = QMessageBox()
+        error_box.setWindowTitle("Error")
+        error_box.setText(f"The guides could not be built at final detail, nothing was written.\n\n{message}")
+        error_box.exec()
+
+    def cancel_save(self):
+        if self.final_render is not None:
+            self.final_render.cancel()
+
+    def close_docker(self):
+        geom_cache.default_cache().save()
+        if TRACE_PATH and TRACER.enabled:
+            TRACER.stop()
+            TRACER.write(TRACE_PATH)
+        if self.recorder is not None:
+            self.recorder.close()
+        self.drop_scratch()
+        self.documents = {}
+        self.load_state(DocumentState(None))
+        self.heads = None
         self.loomis_head = None
         self.close()
 
@@ -0,0 +1,45 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QPainter, QPainterPath, QPen
+
+from .linalg import Segments2
+
+
+def segments_to_path(segments: Segments2) -> QPainterPath:
+    path = QPainterPath()
+    for seg in segments:
+        if len(seg) < 2:
+            continue
+        path.moveTo(seg[0].x, seg[0].y)
+        for p in seg[1:]:
+            path.lineTo(p.x, p.y)
+    return path
+
+
+def stroke_head(
+    p: QPainter,
+    front: QPainterPath,
+    back: QPainterPath,
+    arrow: QPainterPath,
+    color: QColor,
+    front_width: float,
+    back_width: float,
+    dash: list[float],
+) -> None:
+    """Strokes the guides with the same pens and opacity ``build_svg`` writes."""
+    p.setBrush(Qt.NoBrush)
+
+    if back_width > 0:
+        back_color = QColor(color)
+        back_color.setAlphaF(0.6)
+        pen = QPen(back_color, back_width)
+        if dash:
+            # QPen dash patterns are in units of the pen width, SVG ones in pixels.
+            pen.setDashPattern([v / back_width for v in dash])
+        p.setPen(pen)
+        p.drawPath(back)
+
+    p.setPen(QPen(color, front_width))
+    p.drawPath(front)
+
+    p.setPen(QPen(color, front_width + 1))
+    p.drawPath(arrow)
@@ -0,0 +1,94 @@
+from typing import NamedTuple
+
+
+class Quality(NamedTuple):
+    samples: int  # circle samples, see LoomisHead3D.build_paths
+    precision: int  # decimals of the SVG coordinates
+    back_lines: bool  # False drops the dashed hidden lines, about half the shapes
+
+
+# Cheapest first. Precision drops only where the samples are too coarse for
+# the extra decimals to show.
+LEVELS = (
+    Quality(32, 1, False),
+    Quality(48, 1, True),
+    Quality(64, 2, True),
+    Quality(96, 2, True),
+    Quality(128, 2, True),
+    Quality(192, 3, True),
+    Quality(256, 3, True),
+    Quality(384, 3, True),
+    Quality(512, 3, True),
+)
+DEFAULT_LEVEL = LEVELS.index(Quality(256, 3, True))
+
+# Frames in a row over budget before stepping down, and comfortably under it
+# before stepping up. Down is quick so lag goes away within a few frames; up
+# is slow so a level that just fits is not left and re-entered every frame.
+DOWN_FRAMES = 2
+UP_FRAMES = 12
+# Step up only below this fraction of the budget, so the next level, at
+# roughly 1.5 times the cost, still fits.
+UP_HEADROOM = 0.5
+# Weight of the newest frame in the smoothed cost.
+SMOOTHING = 0.3
+
+
+class QualityController:
+    """
+    Picks the detail of interactive redraws from their measured cost, so a
+    drag stays within ``budget`` seconds per frame on a slow tablet and gets
+    more detail on a fast workstation. ``observe`` is fed the cost of every
+    interactive frame; with ``budget`` None the quality stays at the default.
+    """
+
+    def __init__(self, budget: float | None = 1 / 30, level: int = DEFAULT_LEVEL) -> None:
+        self.budget = budget
+        self.level = level
+        self.cost: float | None = None  # smoothed seconds per frame at the current level
+        self.over = 0
+        self.under = 0
+
+    def set_budget(self, budget: float | None) -> None:
+        self.budget = budget
+        if budget is None:
+            self.level = DEFAULT_LEVEL
+        self._reset()
+
+    def quality(self) -> Quality:
+        """Detail for the next interactive frame."""
+        return LEVELS[self.level]
+
+    def rest_quality(self) -> Quality:
+        """Detail once the interaction ends: never below the default, a single frame can afford it."""
+        return LEVELS[max(self.level, DEFAULT_LEVEL)]
+
+    def observe(self, seconds: float) -> None:
+        if self.budget is None:
+            return
+        self.cost = seconds if self.cost is None else self.cost + SMOOTHING * (seconds - self.cost)
+        if self.cost > self.budget:
+            self.over += 1
+            self.under = 0
+            if self.over >= DOWN_FRAMES:
+                self._step(-1)
+        elif self.cost < self.budget * UP_HEADROOM:
+            self.under += 1
+            self.over = 0
+            if self.under >= UP_FRAMES:
+                self._step(1)
+        else:
+            self.over = self.under = 0
+
+    def _step(self, direction: int) -> None:
+        level = min(len(LEVELS) - 1, max(0, self.level + direction))
+        if level != self.level:
+            self.level = level
+            # costs measured at the old level say little about the new one
+            self._reset()
+        else:
+            self.over = self.under = 0
+
+    def _reset(self) -> None:
+        self.cost = None
+        self.over = self.under = 0
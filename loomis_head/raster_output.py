@@ -0,0 +1,88 @@
+from collections.abc import Sequence
+
+from PyQt5.QtCore import QByteArray, QRect
+from PyQt5.QtGui import QColor, QImage, QPainter
+
+from .geom_polyline import parse_dash
+from .loomis_head_generator import HeadPaths, LoomisHead3D
+from .qt_paint import segments_to_path, stroke_head
+
+
+class RasterTarget:
+    """
+    Rasterizes the guides into a paint layer instead of building vector shapes.
+
+    Only the head's bounding box is rendered and pushed with ``setPixelData``.
+    The box written by the previous frame is kept as a dirty rect, so each
+    frame clears and rewrites the union of the old and new bounds only.
+    Without ``antialias`` the strokes are painted several times faster, for
+    previews that are replaced on release.
+    """
+
+    def __init__(self, doc, node, antialias: bool = True) -> None:
+        self.doc = doc
+        self.node = node
+        self.dirty = QRect()
+        self.antialias = antialias
+
+    @staticmethod
+    def supported(doc) -> bool:
+        # QImage.Format_ARGB32 is BGRA in memory, which is what an 8-bit RGBA
+        # Krita layer stores; other depths would need a conversion pass.
+        return doc.colorModel() == "RGBA" and doc.colorDepth() == "U8"
+
+    def render(self, heads: Sequence[tuple[LoomisHead3D, HeadPaths]], dash_back: str | None) -> None:
+        new_rect = heads_rect(heads, self.doc.width(), self.doc.height())
+        region = new_rect.united(self.dirty)
+        if region.isEmpty():
+            return
+
+        img = paint_heads(heads, region, dash_back, self.antialias)
+        self.node.setPixelData(image_bytes(img), region.x(), region.y(), region.width(), region.height())
+        self.dirty = new_rect
+        self.doc.refreshProjection()
+
+
+def heads_rect(heads: Sequence[tuple[LoomisHead3D, HeadPaths]], width: int, height: int) -> QRect:
+    """Bounds of the strokes of ``heads``, padded for the pen width and clipped to the document."""
+    rect = QRect()
+    for head, paths in heads:
+        bounds = paths.bounds()
+        if bounds is None:
+            continue
+        pad = max(head.front_line_stroke + 1, head.back_line_stroke) * 0.5 + 2
+        x0, y0, x1, y1 = bounds
+        rect = rect.united(QRect(int(x0 - pad), int(y0 - pad), int(x1 - x0 + 2 * pad) + 1, int(y1 - y0 + 2 * pad) + 1))
+    return rect.intersected(QRect(0, 0, width, height))
+
+
+def paint_heads(heads: Sequence[tuple[LoomisHead3D, HeadPaths]], region: QRect, dash_back: str | None, antialias: bool = True) -> QImage:
+    """
+    The guides inside ``region`` of the document on a transparent image.
+    Only touches a QImage, so it may run on a worker thread.
+    """
+    img = QImage(region.width(), region.height(), QImage.Format_ARGB32)
+    img.fill(0)
+    p = QPainter(img)
+    p.setRenderHint(QPainter.Antialiasing, antialias)
+    p.translate(-region.x(), -region.y())
+    dash = parse_dash(dash_back)
+    for head, paths in heads:
+        stroke_head(
+            p,
+            segments_to_path(paths.front),
+            segments_to_path(paths.back),
+            segments_to_path(paths.arrow),
+            QColor(head.stroke_color),
+            head.front_line_stroke,
+            head.back_line_stroke,
+            dash,
+        )
+    p.end()
+    return img
+
+
+def image_bytes(img: QImage) -> QByteArray:
+    bits = img.constBits()
+    bits.setsize(img.sizeInBytes())
+    return QByteArray(bytes(bits))
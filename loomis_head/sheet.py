@@ -0,0 +1,102 @@
+import gzip
+import math
+from collections.abc import Iterator
+from typing import IO, NamedTuple
+
+from .linalg import Quaternion, q_from_yaw_pitch_roll
+from .loomis_head_generator import LoomisHead3D, samples_for_tolerance
+
+AXES = ("yaw", "pitch", "roll")
+
+
+class Sweep(NamedTuple):
+    """Angles of one rotation axis, in degrees, from ``start`` to ``stop`` inclusive."""
+
+    axis: str  # one of AXES
+    start: float
+    stop: float
+    steps: int
+
+    def values(self) -> list[float]:
+        if self.steps <= 1:
+            return [self.start]
+        step = (self.stop - self.start) / (self.steps - 1)
+        return [self.start + i * step for i in range(self.steps)]
+
+
+class TurnaroundSheet:
+    """
+    A grid of one head swept across yaw, pitch and roll: ``columns`` varies
+    along each row, ``rows`` down the sheet, and ``fixed`` holds the angles of
+    any axis neither sweeps.
+
+    ``write`` streams the sheet cell by cell, building one row of poses at a
+    time, so memory stays bounded by a single row however large the grid.
+    """
+
+    def __init__(
+        self,
+        head: LoomisHead3D,
+        columns: Sweep,
+        rows: Sweep | None = None,
+        cell_width: float = 256.0,
+        cell_height: float = 256.0,
+    ) -> None:
+        self.head = head
+        self.columns = columns
+        self.rows = rows or Sweep("pitch", 0.0, 0.0, 1)
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.fixed: dict[str, float] = {}
+        self.dash_back: str | None = "5,6"
+        self.labels: bool = True
+        self.label_size: float = 12.0
+        self.tolerance: float = 0.25  # px, picks the sample count for the cell size
+
+    def pose(self, row_value: float, column_value: float) -> tuple[str, Quaternion]:
+        angles = {axis: self.fixed.get(axis, 0.0) for axis in AXES}
+        angles[self.rows.axis] = row_value
+        angles[self.columns.axis] = column_value
+        swept = (self.rows.axis, self.columns.axis)
+        label = " ".join(f"{axis} {angles[axis]:g}°" for axis in AXES if axis in swept or angles[axis])
+        q = q_from_yaw_pitch_roll(*(math.radians(angles[axis]) for axis in AXES))
+        return label, q
+
+    def size(self) -> tuple[float, float]:
+        return self.columns.steps * self.cell_width, self.rows.steps * self.cell_height
+
+    def _label_height(self) -> float:
+        return 1.6 * self.label_size if self.labels else 0.0
+
+    def cells(self) -> Iterator[str]:
+        """The sheet's SVG markup in chunks, one cell at a time."""
+        width, height = self.size()
+        yield f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:g}" height="{height:g}" viewBox="0 0 {width:g} {height:g}">'
+
+        head = self.head
+        label_h = self._label_height()
+        head_h = self.cell_height - label_h
+        samples = samples_for_tolerance(head.radius * head.screen_scale(self.cell_width, head_h), self.tolerance)
+        for r, row_value in enumerate(self.rows.values()):
+            poses = [self.pose(row_value, column_value) for column_value in self.columns.values()]
+            for c, ((label, _), paths) in enumerate(zip(poses, head.build_poses([q for _, q in poses], self.cell_width, head_h, samples))):
+                yield f'<g transform="translate({c * self.cell_width:g},{r * self.cell_height:g})">'
+                yield head.svg_group(paths, self.dash_back)
+                if label_h:
+                    yield (
+                        f'<text x="{0.5 * self.cell_width:g}" y="{self.cell_height - 0.5 * self.label_size:g}"'
+                        f' font-family="sans-serif" font-size="{self.label_size:g}" text-anchor="middle"'
+                        f' fill="{head.stroke_color}">{label}</text>'
+                    )
+                yield "</g>"
+        yield "</svg>"
+
+    def write(self, out: str | IO[str]) -> None:
+        """Writes to an open text file, or to a path; ``.svgz`` paths are gzip-compressed."""
+        if not isinstance(out, str):
+            for chunk in self.cells():
+                out.write(chunk)
+            return
+        f = gzip.open(out, "wt", encoding="utf-8") if out.endswith(".svgz") else open(out, "w", encoding="utf-8")
+        with f:
+            self.write(f)
@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+from collections import deque
+from collections.abc import Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QRect, QTimer, pyqtSignal
+
+from .animation import OrientationTrack
+from .linalg import Quaternion
+from .loomis_head_generator import LoomisHead3D
+from .raster_output import paint_heads
+
+# Frames computed per worker task; small enough that progress moves
+# steadily, large enough for build_poses to batch.
+FRAMES_PER_TASK = 8
+
+# Tasks queued ahead of the one running, so memory stays bounded.
+TASKS_AHEAD = 2
+
+
+def render_frames(
+    heads: Sequence[tuple[LoomisHead3D, Sequence[Quaternion]]],
+    frames: Sequence[int],
+    width: int,
+    height: int,
+    dash_back: str | None,
+    samples: int,
+    out_dir: str,
+) -> list[str]:
+    """
+    Paints ``frames`` into full-canvas PNG files in ``out_dir``, one
+    orientation per frame for every head, and returns their paths. Touches
+    no Krita object, so it runs on a worker thread.
+    """
+    canvas = QRect(0, 0, width, height)
+    per_head = [head.build_poses(qs, width, height, samples) for head, qs in heads]
+    paths: list[str] = []
+    for i, frame in enumerate(frames):
+        pairs = [(head, poses[i]) for (head, _), poses in zip(heads, per_head)]
+        path = os.path.join(out_dir, f"frame_{frame:06d}.png")
+        paint_heads(pairs, canvas, dash_back).save(path, "PNG")
+        paths.append(path)
+    return paths
+
+
+def _nodes(node) -> Iterator:
+    for child in node.childNodes():
+        yield child
+        yield from _nodes(child)
+
+
+class FrameRenderer(QObject):
+    """
+    Renders guide frames for the document's clip range into a new animated
+    paint layer.
+
+    The frames are built and painted ahead of time on one worker thread and
+    saved as an image sequence; the GUI thread only polls for progress. A
+    single worker, because ``build_poses`` is pure Python and more threads
+    would only contend with the GUI thread for the GIL. Once every frame is
+    saved, ``Document.importAnimation`` turns the sequence into a layer with
+    one keyframe per frame in a single undo step, where adding the
+    keyframes one by one left an undo entry per frame.
+    """
+
+    progress = pyqtSignal(int, int)  # frames rendered, total
+    finished = pyqtSignal(object)  # the new layer; None when cancelled or failed
+
+    def __init__(
+        self,
+        doc,
+        heads: Sequence[tuple[LoomisHead3D, OrientationTrack]],
+        dash_back: str | None = "8,8",
+        samples: int = 256,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.doc = doc
+        self.dash_back = dash_back
+        self.samples = samples
+
+        start, end = doc.fullClipRangeStartTime(), doc.fullClipRangeEndTime()
+        self.frames = list(range(start, end + 1))
+        # copies, so edits in the docker do not leak into a render in progress
+        self.heads = [(head.snapshot(), [q if q is not None else head.q for q in track.orientations(start, end)]) for head, track in heads]
+
+        self.pool: ThreadPoolExecutor | None = None
+        self.pending: deque[Future] = deque()
+        self.next_frame = 0
+        self.paths: list[str] = []
+        self.out_dir: str | None = None
+        self.timer = QTimer(self)
+        self.timer.setInterval(15)
+        self.timer.timeout.connect(self._drain)
+
+    def start(self) -> None:
+        self.out_dir = tempfile.mkdtemp(prefix="loomis-head-frames-")
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        while len(self.pending) <= TASKS_AHEAD and self._submit_next():
+            pass
+        self.timer.start()
+
+    def cancel(self) -> None:
+        self._stop()
+        self.finished.emit(None)
+
+    def _submit_next(self) -> bool:
+        if self.next_frame >= len(self.frames):
+            return False
+        i, j = self.next_frame, min(self.next_frame + FRAMES_PER_TASK, len(self.frames))
+        heads = [(head, qs[i:j]) for head, qs in self.heads]
+        w, h = self.doc.width(), self.doc.height()
+        task = self.pool.submit(render_frames, heads, self.frames[i:j], w, h, self.dash_back, self.samples, self.out_dir)
+        self.pending.append(task)
+        self.next_frame = j
+        return True
+
+    def _drain(self) -> None:
+        if not self.pending:
+            layer = self._import()
+            self._stop()
+            self.finished.emit(layer)
+            return
+        if not self.pending[0].done():
+            return
+        if self.pending[0].exception() is not None:
+            self.cancel()
+            return
+
+        # oldest task first, so the files are listed in frame order
+        self.paths += self.pending.popleft().result()
+        self._submit_next()
+        self.progress.emit(len(self.paths), len(self.frames))
+
+    def _import(self):
+        """The layer ``importAnimation`` makes of the saved frames, found as the one node that is new."""
+        before = {node.uniqueId().toString() for node in _nodes(self.doc.rootNode())}
+        playhead = self.doc.currentTime()
+        imported = self.doc.importAnimation(self.paths, self.frames[0], 1)
+        if self.doc.currentTime() != playhead:
+            self.doc.setCurrentTime(playhead)
+        if not imported:
+            return None
+        added = [node for node in _nodes(self.doc.rootNode()) if node.uniqueId().toString() not in before]
+        return added[0] if added else None
+
+    def _stop(self) -> None:
+        self.timer.stop()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        self.pending.clear()
+        if self.out_dir is not None:
+            shutil.rmtree(self.out_dir, ignore_errors=True)
+            self.out_dir = None
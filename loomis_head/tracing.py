@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+from collections import deque
+from contextlib import nullcontext
+from itertools import count
+from time import perf_counter_ns
+
+# Events kept while tracing; a minute of dragging at 120 Hz fits many times over.
+MAX_EVENTS = 200_000
+
+_NO_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: dict | None) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.tracer.complete(self.name, self.start, perf_counter_ns(), self.cat, self.args)
+
+
+class Tracer:
+    """
+    Timed spans of the interaction path, exported as Chrome trace-event JSON
+    for chrome://tracing or Perfetto. While stopped, ``span`` hands out one
+    shared no-op context and nothing is recorded.
+    """
+
+    def __init__(self, max_events: int = MAX_EVENTS) -> None:
+        self.enabled = False
+        self.events: deque[dict] = deque(maxlen=max_events)
+        self._ids = count(1)
+
+    def start(self) -> None:
+        self.events.clear()
+        self.enabled = True
+
+    def stop(self) -> None:
+        self.enabled = False
+
+    @staticmethod
+    def now() -> int:
+        return perf_counter_ns()
+
+    def span(self, name: str, cat: str = "python", args: dict | None = None):
+        """Context manager recording the time spent inside it."""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, cat, args)
+
+    def complete(self, name: str, start_ns: int, end_ns: int, cat: str = "python", args: dict | None = None) -> None:
+        """A span on the calling thread, for work that started and ended there."""
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": start_ns / 1000.0,
+            "dur": (end_ns - start_ns) / 1000.0,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def wait(self, name: str, start_ns: int, end_ns: int, cat: str = "queue") -> None:
+        """
+        Time between posting work and it starting, e.g. a queued redraw. Shown
+        on its own track, since it overlaps the spans of the thread that waits.
+        """
+        if not self.enabled:
+            return
+        common = {"name": name, "cat": cat, "id": next(self._ids), "pid": os.getpid(), "tid": threading.get_ident()}
+        self.events.append({**common, "ph": "b", "ts": start_ns / 1000.0})
+        self.events.append({**common, "ph": "e", "ts": end_ns / 1000.0})
+
+    def chrome_trace(self) -> dict:
+        return {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+# The tracer every module of the plugin records into.
+TRACER = Tracer()
@@ -2,23 +2,32 @@
 import math
 
 from PyQt5.QtCore import QRect, Qt, pyqtSignal
-from PyQt5.QtGui import QBrush, QColor, QPainter, QPen
+from PyQt5.QtGui import QBrush, QColor, QPainter, QPainterPath, QPen, QPixmap
 from PyQt5.QtWidgets import QWidget
 
 from loomis_head.euclid import Vector3
 
 from .linalg import (
     mat3_mul_vec,
-    q_axis_angle,
+    q_from_yaw_pitch_roll,
     q_identity,
-    q_mul,
     q_normalize,
     q_to_mat3,
+    q_to_yaw_pitch_roll,
 )
+from .loomis_head_generator import LoomisHead3D
+from .qt_paint import segments_to_path
+from .tracing import TRACER
+
+# Low LOD for the wireframe drawn inside the trackball; it only spans a few
+# hundred pixels, so this keeps repaints well under a frame at 60 fps.
+PREVIEW_SAMPLES = 48
 
 
 class TrackballWidget(QWidget):
     orientation_changed = pyqtSignal(object)  # emits Quaternion
+    interaction_started = pyqtSignal()
+    interaction_finished = pyqtSignal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -35,6 +44,14 @@ class TrackballWidget(QWidget):
         self._theta0 = 0.0  # start angle for roll
         self._roll0 = 0.0
 
+        # wireframe preview, rebuilt only when orientation, style or size change
+        self._preview_head: LoomisHead3D | None = None
+        self._preview_key: tuple | None = None
+        self._preview_paths: tuple[QPainterPath, QPainterPath, QPainterPath] | None = None
+
+        # ring and disc artwork, regenerated on resize
+        self._static: QPixmap | None = None
+
         self.setMouseTracking(False)
         self._update_quaternion()
 
@@ -55,17 +72,37 @@ class TrackballWidget(QWidget):
         self._q = q_normalize(q)
         self.update()
 
-    def _update_quaternion(self):
-        qy = q_axis_angle([0, 1, 0], self.yaw)
-        qx = q_axis_angle([1, 0, 0], self.pitch)
-        q_turn = q_mul(qy, qx)
+    def set_orientation(self, q):
+        """Moves the trackball to ``q`` without emitting ``orientation_changed``."""
+        self.yaw, self.pitch, self.roll = q_to_yaw_pitch_roll(q)
+        self._q = q_from_yaw_pitch_roll(self.yaw, self.pitch, self.roll)
+        self.update()
+
+    def set_preview_style(self, head: LoomisHead3D) -> None:
+        """Mirrors the guide settings of ``head`` in the trackball wireframe."""
+        if self._preview_head is None:
+            self._preview_head = LoomisHead3D()
+        self._preview_head.copy_style(head)
+        self.update()
 
-        R_turn = q_to_mat3(q_turn)
-        fwd_v = mat3_mul_vec(R_turn, Vector3(0.0, 0.0, 1.0))
-        fwd = [fwd_v.x, fwd_v.y, fwd_v.z]
+    def _preview(self, size: float) -> tuple[QPainterPath, QPainterPath, QPainterPath] | None:
+        head = self._preview_head
+        if head is None or size <= 0:
+            return None
+        head.set_quaternion(self._q)
+        key = (head.state_key(), size)
+        if key != self._preview_key:
+            paths = head.build_paths(size, size, PREVIEW_SAMPLES)
+            self._preview_paths = (
+                segments_to_path(paths.back),
+                segments_to_path(paths.front),
+                segments_to_path(paths.arrow),
+            )
+            self._preview_key = key
+        return self._preview_paths
 
-        q_roll = q_axis_angle(fwd, self.roll)
-        self._q = q_normalize(q_mul(q_roll, q_turn))
+    def _update_quaternion(self):
+        self._q = q_from_yaw_pitch_roll(self.yaw, self.pitch, self.roll)
 
         self.orientation_changed.emit(self._q)
 
@@ -106,6 +143,7 @@ class TrackballWidget(QWidget):
         if self._mode:
             self._dragging = True
             self.setCursor(Qt.ClosedHandCursor)
+            self.interaction_started.emit()
             e.accept()
         else:
             super().mousePressEvent(e)
@@ -114,21 +152,22 @@ class TrackballWidget(QWidget):
         if not self._dragging or not self._mode:
             return super().mouseMoveEvent(e)
 
-        if self._mode == "turntable":
-            v = self._pos_to_forward_vec(e.pos())
-            self.yaw = math.atan2(float(v[0]), float(v[2]))  # right = +yaw
-            self.pitch = -math.asin(max(-1.0, min(1.0, float(v[1]))))  # up = +pitch
-            self._update_quaternion()
-
-        elif self._mode == "roll":
-            th = self._angle_at(e.pos())
-            dth = th - self._theta0
-            if dth > math.pi:
-                dth -= 2 * math.pi
-            elif dth < -math.pi:
-                dth += 2 * math.pi
-            self.roll = self._roll0 + dth
-            self._update_quaternion()
+        with TRACER.span("TrackballWidget.mouseMoveEvent", "input"):
+            if self._mode == "turntable":
+                v = self._pos_to_forward_vec(e.pos())
+                self.yaw = math.atan2(float(v[0]), float(v[2]))  # right = +yaw
+                self.pitch = -math.asin(max(-1.0, min(1.0, float(v[1]))))  # up = +pitch
+                self._update_quaternion()
+
+            elif self._mode == "roll":
+                th = self._angle_at(e.pos())
+                dth = th - self._theta0
+                if dth > math.pi:
+                    dth -= 2 * math.pi
+                elif dth < -math.pi:
+                    dth += 2 * math.pi
+                self.roll = self._roll0 + dth
+                self._update_quaternion()
 
         e.accept()
 
@@ -137,6 +176,7 @@ class TrackballWidget(QWidget):
             self._dragging = False
             self._mode = None
             self.unsetCursor()
+            self.interaction_finished.emit()
             e.accept()
         else:
             super().mouseReleaseEvent(e)
@@ -145,16 +185,43 @@ class TrackballWidget(QWidget):
         self.yaw = self.pitch = self.roll = 0.0
         self._update_quaternion()
 
+    def resizeEvent(self, ev):
+        self._static = None
+        super().resizeEvent(ev)
+
+    def _static_pixmap(self) -> QPixmap:
+        dpr = self.devicePixelRatioF()
+        if self._static is not None and self._static.devicePixelRatioF() == dpr:
+            return self._static
+
+        pm = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+        pm.setDevicePixelRatio(dpr)
+        pm.fill(Qt.transparent)
+
+        p = QPainter(pm)
+        p.setRenderHint(QPainter.Antialiasing)
+        cx, cy, r = self._center_radius()
+        ring_inner = 0.82 * r
+
+        p.setPen(QPen(QColor(170, 170, 170), 2))
+        p.setBrush(Qt.NoBrush)
+        p.drawEllipse(QRect(int(cx - r), int(cy - r), int(2 * r), int(2 * r)))
+
+        p.setPen(QPen(QColor(160, 160, 200), 2))
+        p.setBrush(QBrush(QColor(235, 235, 255)))
+        p.drawEllipse(QRect(int(cx - ring_inner), int(cy - ring_inner), int(2 * ring_inner), int(2 * ring_inner)))
+        p.end()
+
+        self._static = pm
+        return pm
+
     def paintEvent(self, ev):
         p = QPainter(self)
+        p.drawPixmap(0, 0, self._static_pixmap())
         p.setRenderHint(QPainter.Antialiasing)
         cx, cy, r = self._center_radius()
-        rect = QRect(int(cx - r), int(cy - r), int(2 * r), int(2 * r))
 
         ring_inner = 0.82 * r
-        p.setPen(QPen(QColor(170, 170, 170), 2))
-        p.setBrush(Qt.NoBrush)
-        p.drawEllipse(rect)
         if ring_inner > 0:
             th = self.roll
             x = cx + math.cos(th) * r
@@ -162,13 +229,29 @@ class TrackballWidget(QWidget):
             p.setPen(QPen(QColor(120, 120, 120), 3))
             p.drawLine(int(x), int(y), int(cx + math.cos(th) * (r - 10)), int(cy - math.sin(th) * (r - 10)))
 
-        inner = QRect(int(cx - ring_inner), int(cy - ring_inner), int(2 * ring_inner), int(2 * ring_inner))
-        p.setPen(QPen(QColor(160, 160, 200), 2))
-        p.setBrush(QBrush(QColor(235, 235, 255)))
-        p.drawEllipse(inner)
+        preview = self._preview(2.0 * ring_inner)
+        if preview is None:
+            R = q_to_mat3(self._q)
+            v = mat3_mul_vec(R, Vector3(0.0, 0.0, 1.0))
+            tip = (cx + v.x * ring_inner, cy - v.y * ring_inner)
+            p.setPen(QPen(QColor(100, 100, 210), 3))
+            p.drawLine(int(cx), int(cy), int(tip[0]), int(tip[1]))
+            return
+
+        back, front, arrow = preview
+        color = QColor(self._preview_head.stroke_color)
+        p.translate(cx - ring_inner, cy - ring_inner)
+        p.setBrush(Qt.NoBrush)
+
+        back_color = QColor(color)
+        back_color.setAlphaF(0.45)
+        back_pen = QPen(back_color, 1.5)
+        back_pen.setStyle(Qt.DashLine)
+        p.setPen(back_pen)
+        p.drawPath(back)
+
+        p.setPen(QPen(color, 2))
+        p.drawPath(front)
 
-        R = q_to_mat3(self._q)
-        v = mat3_mul_vec(R, Vector3(0.0, 0.0, 1.0))
-        tip = (cx + v.x * ring_inner, cy - v.y * ring_inner)
         p.setPen(QPen(QColor(100, 100, 210), 3))
-        p.drawLine(int(cx), int(cy), int(tip[0]), int(tip[1]))
+        p.drawPath(arrow)